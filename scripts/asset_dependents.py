@@ -0,0 +1,102 @@
+"""
+List or rebuild the generated SVGs that embed particular glyph assets.
+
+Reads data/asset_index.json, written by batch_generate_svgs.py. Assets can be
+given as keys ('syllable:ka', 'word:sewi', 'compound:jan-sewi', 'cartouche'),
+as bare names ('ka', 'sewi'), or as paths to the source files: a ..sfdir/
+.glyph file, a uniform_syllables/ or sitelen_seli_kiwen_svgs/ SVG, or the
+cartouche SVG.
+
+Usage:
+    python asset_dependents.py list ..sfdir/ka.sitelen_kalama_pona.glyph
+    python asset_dependents.py list sewi
+    python asset_dependents.py rebuild syllable:ka --jobs 4
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import batch_generate_svgs
+from generate_sitelen_kalama_pona import CARTOUCHE_SVG
+
+SCRIPT_DIR = Path(__file__).parent
+ROOT_DIR = SCRIPT_DIR.parent
+
+
+def load_asset_index():
+    index_path = ROOT_DIR / 'data' / 'asset_index.json'
+    if not index_path.exists():
+        print(f'Missing {index_path} - run batch_generate_svgs.py first',
+              file=sys.stderr)
+        sys.exit(1)
+    with open(index_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_asset(arg, known_assets):
+    """Map a command-line asset argument to the asset keys it refers to."""
+    if ':' in arg or arg == 'cartouche':
+        return [arg]
+
+    name = Path(arg).name
+    if name == CARTOUCHE_SVG.name:
+        return ['cartouche']
+    if name.endswith('.sitelen_kalama_pona.glyph'):
+        return [f'syllable:{name[:-len(".sitelen_kalama_pona.glyph")]}']
+    if name.startswith('sitelen kalama pona - ') and name.endswith('.svg'):
+        svg_name = name[len('sitelen kalama pona - '):-len('.svg')]
+        # Null-onset syllables are stored as 'xa', 'xan', ...
+        if svg_name.startswith('x'):
+            svg_name = svg_name[1:]
+        return [f'syllable:{svg_name}']
+    if name.startswith('Sitelen seli kiwen - ') and name.endswith('.svg'):
+        word = name[len('Sitelen seli kiwen - '):-len('.svg')]
+        return [f'compound:{word}' if '-' in word else f'word:{word}']
+
+    return [asset for asset in known_assets if asset.partition(':')[2] == arg]
+
+
+def affected_outputs(args, asset_index):
+    """Resolve the arguments and return (asset keys, sorted output filenames)."""
+    assets = []
+    for arg in args:
+        resolved = resolve_asset(arg, asset_index)
+        if not resolved:
+            print(f'Warning: no asset matches "{arg}"', file=sys.stderr)
+        assets.extend(resolved)
+    outputs = set()
+    for asset in assets:
+        outputs.update(asset_index.get(asset, []))
+    return assets, sorted(outputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help='print the outputs that use the assets')
+    list_parser.add_argument('assets', nargs='+')
+    rebuild_parser = sub.add_parser('rebuild', help='re-render only those outputs')
+    rebuild_parser.add_argument('assets', nargs='+')
+    rebuild_parser.add_argument('--jobs', '-j', type=int, default=1,
+                                help='worker processes (0 = one per CPU, default 1)')
+    args = parser.parse_args()
+
+    assets, outputs = affected_outputs(args.assets, load_asset_index())
+
+    if args.command == 'list':
+        for name in outputs:
+            print(name)
+        print(f'{len(outputs)} outputs use {", ".join(assets) or "no known assets"}',
+              file=sys.stderr)
+        return
+
+    if not assets:
+        sys.exit(1)
+    print(f'Rebuilding {len(outputs)} outputs that use {", ".join(assets)}\n')
+    batch_generate_svgs.main(['--jobs', str(args.jobs), '--rebuild-assets', *assets])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,70 +1,792 @@
 """
 Batch generate sitelen ilo pona SVGs for all toki pona Wikipedia titles.
 
-Reads wikidata_tok_labels.csv (qid, label, tok_title) and runs
-generate_sitelen_kalama_pona.generate() for each one.
+Reads data/wikidata_tok_labels.csv (qid, label, tok_title) and runs
+generate_sitelen_kalama_pona.generate() for each one. Builds are
+incremental (data/output_manifest.json), rows with the same label share
+one output, and data/asset_index.json maps glyph assets to the outputs that
+use them (see asset_dependents.py).
 
 Usage:
     python batch_generate_svgs.py
+    python batch_generate_svgs.py --jobs 8
+    python batch_generate_svgs.py --force --prune
+    python batch_generate_svgs.py --resume
+    python batch_generate_svgs.py --rebuild-assets syllable:ka word:sewi
+    python batch_generate_svgs.py --shard 2/4 --jobs 0
+    python batch_generate_svgs.py --merge
+    python batch_generate_svgs.py --layout hash
+    python batch_generate_svgs.py --force --timings timings.json
+    python batch_generate_svgs.py --force --profile --tracemalloc
+    python batch_generate_svgs.py --root /tmp/scale --jobs 0
+    python batch_generate_svgs.py --validate
+    python batch_generate_svgs.py --strict
 """
 
+import argparse
+import cProfile
 import csv
+import hashlib
 import json
+import os
+import pstats
 import sys
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, tee
 from pathlib import Path
 
-from generate_sitelen_kalama_pona import generate
+from generate_sitelen_kalama_pona import (
+    ASSETS, GENERATOR_VERSION, MAX_PRECISION, STAGE_TIMES, generate, output_relpath,
+    parse_precision, plan_many,
+)
+from output_writer import WRITER_THREADS, OutputWriter
 
 SCRIPT_DIR = Path(__file__).parent
 ROOT_DIR = SCRIPT_DIR.parent
 
+CHUNK_SIZE = 64
+
+PROFILE_PATH = ROOT_DIR / 'build' / 'batch.pstats'
+PROFILE_TOP = 25
+TRACEMALLOC_FRAMES = 1
+TRACEMALLOC_TOP = 10
+
+# generate() options that change how files are written but not their bytes
+WRITE_OPTIONS = {'layout', 'output_dir'}
+
+# This process's background writer (see output_writer.py), if any
+WRITER = None
+
+
+def parse_shard(text):
+    """'i/N' -> (i, N) with 1 <= i <= N."""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected i/N, got "{text}"')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f'shard {index} is not in 1..{count}')
+    return index, count
+
+
+def parse_layout(text):
+    """'flat', 'hash' or 'hash:N' (1 <= N <= 4) -> canonical layout name.
+
+    hash:N puts each output in a subdirectory named by the first N hex
+    digits of its filename's hash (see output_relpath), which keeps
+    directories small. The layout is kept in the manifest; changing it
+    moves the existing files.
+    """
+    kind, _, width = text.partition(':')
+    if text == 'flat':
+        return text
+    if kind == 'hash' and (not width or width in ('1', '2', '3', '4')):
+        return f'hash:{width or 2}'
+    raise argparse.ArgumentTypeError(f'expected flat, hash or hash:N (N = 1..4), got "{text}"')
+
+
+def shard_of(qid, count):
+    """Stable shard number (1..count) for a QID.
+
+    Outputs are sharded by the QID of the row that owns them, so N machines
+    can split a run without overlap.
+    """
+    digest = hashlib.sha1(qid.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
 
-def main():
-    csv_file = ROOT_DIR / 'data' / 'wikidata_tok_labels.csv'
-    if not csv_file.exists():
-        print(f'Missing {csv_file} - run fetch_wikidata_sparql.py first',
-              file=sys.stderr)
-        sys.exit(1)
 
-    rows = []
+def shard_dir(index, count, root=ROOT_DIR):
+    return root / 'data' / 'shards' / f'{index}-of-{count}'
+
+
+def output_owners(planned):
+    """Output filename -> (row number, row, plan) of the first row writing it.
+
+    An output's bytes, name and description come from its label, so rows
+    with the same label (e.g. 'ala' under several QIDs) share one output,
+    rendered once, and output_index.json lists every QID using it under
+    'qids'. The first row owns it, so appending rows never changes a
+    published file.
+    """
+    owners = {}
+    for i, (row, row_plan) in enumerate(planned):
+        owners.setdefault(row_plan['output_name'], (i, row, row_plan))
+    return owners
+
+
+def index_outputs(planned, owners, errors):
+    """Index every row that has an output, in CSV order.
+
+    Returns ([(row number, filename, qid, tok_title)], [(row number, label,
+    error)]). A row whose label differs from its output's owner (both map
+    to one filename, e.g. 'jan Osi Lo' and 'jan Osilo') is failed rather
+    than pointed at a file describing another label.
+    """
+    indexed = []
+    failed = []
+    for i, (row, row_plan) in enumerate(planned):
+        name = row_plan['output_name']
+        if name not in owners:
+            continue
+        owner_label = owners[name][1]['label']
+        if row['label'] != owner_label:
+            failed.append((i, row['label'], f'{name} is the output of "{owner_label}"'))
+        elif name in errors:
+            failed.append((i, row['label'], errors[name]))
+        else:
+            indexed.append((i, name, row['qid'], row['tok_title']))
+    return indexed, failed
+
+
+def plan_rows(csv_file):
+    """(row, plan) for each CSV row; compounds are matched in one batch."""
+    rows, labels = tee(read_rows(csv_file))
+    return zip(rows, plan_many((row['label'] for row in labels), ASSETS))
+
+
+def read_rows(csv_file):
+    """Stream the CSV rows as {qid, label, tok_title} dicts."""
     with open(csv_file, encoding='utf-8', newline='') as f:
         for row in csv.DictReader(f):
-            rows.append({
+            yield {
                 'qid': row['qid'],
                 'label': row['label'],
                 'tok_title': row.get('tok_title', ''),
-            })
+            }
 
-    print(f'Generating SVGs for {len(rows)} titles...\n')
 
-    success = 0
-    failed = []
-    index = {}  # filename -> {qid, tok_title}
+def load_journal(path):
+    """Journaled results of an unfinished run: output filename -> record.
+
+    Every rendered output is appended to data/batch_journal.jsonl once its
+    files are written, so --resume can skip it. A finished run compacts the
+    journal into the index, manifest and asset index, and removes it.
+    """
+    records = {}
+    if not path.exists():
+        return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            records[record['output']] = record
+    return records
+
+
+def read_manifest(path):
+    """A manifest file as written by save_manifest(), or None if there is none."""
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
 
-    for i, row in enumerate(rows, 1):
-        label, qid, tok_title = row['label'], row['qid'], row['tok_title']
-        print(f'[{i}/{len(rows)}] {label}')
+
+def load_manifest(path):
+    """Previous run's manifest entries: output filename -> {label, hash, assets, path}."""
+    return (read_manifest(path) or {}).get('outputs', {})
+
+
+def save_manifest(path, outputs, layout='flat', failed=()):
+    """Write the manifest: per output its label, render_hash(), assets and path.
+
+    Outputs whose hash is unchanged are skipped by the next run, and
+    downstream scripts read the paths here instead of listing output/.
+    'failed' maps the labels of failed rows to their errors.
+    """
+    # One line per output keeps weekly diffs of this file readable
+    lines = [
+        f'  {json.dumps(name, ensure_ascii=False)}: {json.dumps(entry, ensure_ascii=False)}'
+        for name, entry in sorted(outputs.items())
+    ]
+    failed_lines = [
+        f'  {json.dumps(label, ensure_ascii=False)}: {json.dumps(error, ensure_ascii=False)}'
+        for label, error in sorted({label: error for _, label, error in failed}.items())
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{\n "generator_version": {GENERATOR_VERSION},\n'
+                f' "layout": {json.dumps(layout)},\n "outputs": {{\n')
+        f.write(',\n'.join(lines))
+        f.write('\n },\n "failed": {\n' if failed_lines else '\n }\n}\n')
+        if failed_lines:
+            f.write(',\n'.join(failed_lines))
+            f.write('\n }\n}\n')
+
+
+def save_asset_index(path, manifest):
+    """Write the reverse index: asset key -> sorted output filenames using it."""
+    dependents = {}
+    for name, entry in manifest.items():
+        for asset in entry['assets']:
+            dependents.setdefault(asset, []).append(name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({asset: sorted(names) for asset, names in sorted(dependents.items())},
+                  f, ensure_ascii=False, indent=0)
+
+
+def render_hash(label, assets, options):
+    """Hash of everything that determines an output's bytes."""
+    key = [
+        GENERATOR_VERSION,
+        sorted((k, v) for k, v in options.items() if k not in WRITE_OPTIONS),
+        label,
+        [[asset, ASSETS.digest(asset)] for asset in assets],
+    ]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def entry_path(name, entry):
+    """An output's path under output/; manifests before layouts were flat."""
+    return entry.get('path', name)
+
+
+def relocate(output_dir, old_path, new_path):
+    """Move an output and its sidecar to a new layout path, if they exist."""
+    moved = False
+    for old, new in ((old_path, new_path), (f'{old_path}.wiki.txt', f'{new_path}.wiki.txt')):
+        if (output_dir / old).exists():
+            (output_dir / new).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(output_dir / old, output_dir / new)
+            moved = True
+    if moved:
         try:
-            output_path = generate(label)
-            if output_path:
-                index[output_path.name] = {'qid': qid, 'tok_title': tok_title}
-            success += 1
-        except Exception as exc:
-            print(f'  ERROR: {exc}')
-            failed.append((label, str(exc)))
-        print()
-
-    index_path = ROOT_DIR / 'data' / 'output_index.json'
-    with open(index_path, 'w', encoding='utf-8') as f:
-        json.dump(index, f, ensure_ascii=False, indent=None)
-    print(f'Wrote {index_path} ({len(index)} entries)')
+            (output_dir / old_path).parent.rmdir()
+        except OSError:
+            pass
+
+
+def is_up_to_date(output_dir, name, entry, previous):
+    return (
+        previous is not None
+        and previous.get('hash') == entry['hash']
+        and entry_path(name, previous) == entry['path']
+        and (output_dir / entry['path']).exists()
+        and (output_dir / f'{entry["path"]}.wiki.txt').exists()
+    )
+
+
+def render_row(row, options, verbose=False):
+    """Render one CSV row. Returns (output filename or None, error or None)."""
+    try:
+        output_path = generate(row['label'], assets=ASSETS, verbose=verbose,
+                               writer=WRITER, **options)
+    except Exception as exc:
+        return None, str(exc)
+    return (output_path.name if output_path else None), None
+
+
+def _init_worker(writer_threads=0):
+    global WRITER
+    # Warm-load the glyph bundle and compound index once per worker process
+    ASSETS.compound_index()
+    if writer_threads:
+        WRITER = OutputWriter(writer_threads)
+
+
+def _finish_chunk(start, results):
+    """Wait for a chunk's files to be written and return its timings.
+
+    Results are only journaled once their files are on disk, so a killed
+    run never journals an output it did not write. results is a list of
+    (output filename, error); an output whose files could not be written
+    is turned into an error in place.
+    """
+    if WRITER:
+        errors = WRITER.flush()
+        timing = WRITER.take_stats()
+        for i, (output_name, error) in enumerate(results):
+            if output_name in errors:
+                results[i] = (None, str(errors[output_name]))
+    else:
+        timing = {'writes': 0, 'write_s': 0.0, 'blocked_s': 0.0}
+    timing['render_s'] = time.perf_counter() - start - timing['blocked_s']
+    return timing
+
+
+def _render_chunk(chunk, options):
+    start = time.perf_counter()
+    results = [render_row(row, options) for row in chunk]
+    timing = _finish_chunk(start, results)
+    return results, timing, STAGE_TIMES.take()
+
+
+def _add_timing(total, timing):
+    for key, value in timing.items():
+        total[key] = total.get(key, 0) + value
+
+
+def report_timing(timing, writer_threads):
+    if not timing:
+        return
+    if not writer_threads:
+        print(f'Rendering and writing: {timing["render_s"]:.1f} s')
+        return
+    busy = timing['render_s'] + timing['blocked_s']
+    print(f'Rendering: {timing["render_s"]:.1f} s, blocked on output I/O: '
+          f'{timing["blocked_s"]:.1f} s ({timing["blocked_s"] / busy if busy else 0:.0%}); '
+          f'{timing["writes"]} files written in {timing["write_s"]:.1f} s '
+          f'by {writer_threads} writer threads per process')
 
-    print(f'\nDone! {success} succeeded, {len(failed)} failed.')
+
+def iter_results(rows, total, options, jobs, chunk_size=CHUNK_SIZE,
+                 writer_threads=0, timing=None):
+    """Yield (row, output_name, error) for every row, in input order.
+
+    `rows` may be any iterable; with several workers at most 2 * jobs
+    chunks are queued at a time. Files are written by writer_threads
+    background threads per process (0 = write synchronously), and each
+    chunk is yielded once its files are written. Render, blocked and
+    write times (in seconds, summed over processes) are added to `timing`,
+    and the workers' time per stage to STAGE_TIMES.
+    """
+    global WRITER
+    if timing is None:
+        timing = {}
+    if jobs == 1:
+        _init_worker(writer_threads)
+        rows = iter(rows)
+        done = 0
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                start = time.perf_counter()
+                results = []
+                for row in chunk:
+                    done += 1
+                    print(f'[{done}/{total}] {row["label"]}')
+                    output_name, error = render_row(row, options, verbose=True)
+                    if error:
+                        print(f'  ERROR: {error}')
+                    print()
+                    results.append((output_name, error))
+                rendered = list(results)
+                _add_timing(timing, _finish_chunk(start, results))
+                for row, result, (output_name, error) in zip(chunk, rendered, results):
+                    if result[1] != error:
+                        print(f'ERROR writing {row["label"]}: {error}')
+                    yield row, output_name, error
+        finally:
+            if WRITER:
+                WRITER.close()
+                WRITER = None
+        return
+
+    # Load (and if needed rebuild) the bundle before forking so workers
+    # don't race to rebuild it.
+    ASSETS.compound_index()
+    rows = iter(rows)
+    done = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(writer_threads,)) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * jobs:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                pending.append((chunk, pool.submit(_render_chunk, chunk, options)))
+            if not pending:
+                break
+            chunk, future = pending.popleft()
+            results, chunk_timing, stage_times = future.result()
+            _add_timing(timing, chunk_timing)
+            STAGE_TIMES.merge(stage_times)
+            done += len(chunk)
+            print(f'[{done}/{total}] rendered')
+            for row, (output_name, error) in zip(chunk, results):
+                yield row, output_name, error
+
+
+def describe_problems(problems):
+    return ', '.join(f"{problem['text']!r} at {problem['start']} ({problem['reason']})"
+                     for problem in problems)
+
+
+def validate(csv_file):
+    """List the labels whose names are not toki pona. Returns how many there are."""
+    invalid = {}  # label -> (first QID, problems)
+    reasons = {}
+    row_count = 0
+    for row, row_plan in plan_rows(csv_file):
+        row_count += 1
+        problems = row_plan['name_problems']
+        if problems and row['label'] not in invalid:
+            invalid[row['label']] = (row['qid'], problems)
+            for problem in problems:
+                reasons[problem['reason']] = reasons.get(problem['reason'], 0) + 1
+    for label, (qid, problems) in invalid.items():
+        print(f'  {qid} {label}: {describe_problems(problems)}')
+    counts = ', '.join(f'{reason}: {count}' for reason, count in sorted(reasons.items()))
+    print(f'\n{len(invalid)} labels in {row_count} rows have names that are not toki pona'
+          f'{f" ({counts})" if counts else ""}')
+    return len(invalid)
+
+
+def report_failures(failed):
     if failed:
         print('\nFailed titles:')
-        for title, err in failed:
+        for _, title, err in failed:
             print(f'  {title}: {err}')
 
 
+def finish(index_rows, failed, manifest, previous, owners, prune, layout, root=ROOT_DIR):
+    """Handle vanished outputs and write the manifest, asset index and output index."""
+    output_dir = root / 'output'
+    vanished = sorted(name for name in previous if name not in owners)
+    if vanished:
+        action = 'Pruning' if prune else 'Not in CSV any more (use --prune to delete)'
+        print(f'{action}: {len(vanished)} outputs')
+        for name in vanished:
+            print(f'  {name}')
+            if prune:
+                path = entry_path(name, previous[name])
+                for path in (output_dir / path, output_dir / f'{path}.wiki.txt'):
+                    if path.exists():
+                        path.unlink()
+            else:
+                manifest[name] = previous[name]
+
+    manifest_path = root / 'data' / 'output_manifest.json'
+    save_manifest(manifest_path, manifest, layout, failed)
+    print(f'Wrote {manifest_path} ({len(manifest)} entries'
+          f'{f", {len(failed)} failed titles" if failed else ""})')
+    asset_index_path = root / 'data' / 'asset_index.json'
+    save_asset_index(asset_index_path, manifest)
+    print(f'Wrote {asset_index_path}')
+
+    # filename -> {qid, tok_title} of the row it was rendered from (the
+    # first), plus the QIDs of every row that uses it
+    index = {}
+    for _, name, qid, tok_title in sorted(index_rows):
+        if name not in index:
+            index[name] = {'qid': qid, 'tok_title': tok_title, 'qids': []}
+        if qid not in index[name]['qids']:
+            index[name]['qids'].append(qid)
+    index_path = root / 'data' / 'output_index.json'
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=None)
+    print(f'Wrote {index_path} ({len(index)} entries)')
+
+
+def write_shard(directory, shard, index_rows, failed, manifest, owners, layout):
+    """Write one shard's results for --merge; shard is (i, N)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'results.json', 'w', encoding='utf-8') as f:
+        json.dump({'shard': list(shard), 'outputs': sorted(owners), 'index': index_rows,
+                   'failed': failed}, f, ensure_ascii=False)
+    save_manifest(directory / 'output_manifest.json', manifest, layout)
+    print(f'Wrote shard results to {directory}')
+
+
+def merge_shards(prune=False, root=ROOT_DIR):
+    """Combine data/shards/<i>-of-<N>/ into the canonical index, manifest and asset index.
+
+    Returns the failed rows of all shards.
+    """
+    shards_root = root / 'data' / 'shards'
+    directories = sorted(shards_root.glob('*-of-*')) if shards_root.exists() else []
+    counts = {directory.name.split('-of-')[1] for directory in directories}
+    if not directories or len(counts) != 1:
+        print(f'Expected shard folders of one run in {shards_root}, found: '
+              f'{", ".join(d.name for d in directories) or "none"}', file=sys.stderr)
+        sys.exit(1)
+    count = int(counts.pop())
+    missing = sorted(set(range(1, count + 1)) - {int(d.name.split('-of-')[0]) for d in directories})
+    if missing:
+        print(f'Missing shards {missing} of {count}', file=sys.stderr)
+        sys.exit(1)
+    if any((d / 'batch_journal.jsonl').exists() for d in directories):
+        print('Some shards did not finish (journal still present)', file=sys.stderr)
+        sys.exit(1)
+
+    owners = set()
+    index_rows = []
+    failed = []
+    manifest = {}
+    layouts = set()
+    for directory in directories:
+        with open(directory / 'results.json', encoding='utf-8') as f:
+            results = json.load(f)
+        # The folder name alone does not prove which run wrote the files
+        if results.get('shard') != [int(part) for part in directory.name.split('-of-')]:
+            print(f'{directory} holds results of shard {results.get("shard", "?")}, not '
+                  f'{directory.name}; rerun that shard', file=sys.stderr)
+            sys.exit(1)
+        owners.update(results['outputs'])
+        index_rows += [tuple(item) for item in results['index']]
+        failed += [tuple(item) for item in results['failed']]
+        shard_manifest = read_manifest(directory / 'output_manifest.json')
+        manifest.update(shard_manifest['outputs'])
+        layouts.add(shard_manifest.get('layout', 'flat'))
+    if len(layouts) != 1:
+        print(f'Shards were rendered with different layouts: {", ".join(sorted(layouts))}',
+              file=sys.stderr)
+        sys.exit(1)
+    failed.sort()
+    print(f'Merging {count} shards: {len(index_rows)} indexed titles, {len(failed)} failed')
+
+    previous = load_manifest(root / 'data' / 'output_manifest.json')
+    finish(index_rows, failed, manifest, previous, owners, prune, layouts.pop(), root)
+    print(f'\nDone! {len(index_rows)} succeeded, {len(failed)} failed.')
+    report_failures(failed)
+    return failed
+
+
+def run(args):
+    """A batch run (or --merge) for the parsed command-line arguments.
+
+    Only rendering is bounded in memory (see iter_results()). The owners,
+    manifest and index hold an entry per distinct output, about 3 KB each:
+    with --tracemalloc a full build peaked at 24 MB for 5,000 synthetic rows
+    and 68 MB for 20,000 (scale_test.py corpus).
+
+    Returns the failed rows as (row number, label, error).
+    """
+    rebuild_assets = set(args.rebuild_assets)
+    STAGE_TIMES.take()
+    options = {'symbols': args.symbols, 'bake': args.bake}
+    if args.bake:
+        options['precision'] = args.precision
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.merge:
+        return merge_shards(prune=args.prune, root=args.root)
+
+    root = args.root
+    csv_file = root / 'data' / 'wikidata_tok_labels.csv'
+    if not csv_file.exists():
+        print(f'Missing {csv_file} - run fetch_wikidata_sparql.py first',
+              file=sys.stderr)
+        sys.exit(1)
+    if args.validate:
+        sys.exit(1 if validate(csv_file) else 0)
+
+    output_dir = root / 'output'
+    manifest_path = root / 'data' / 'output_manifest.json'
+    journal_path = root / 'data' / 'batch_journal.jsonl'
+    previous_manifest = read_manifest(manifest_path) or {}
+    previous = previous_manifest.get('outputs', {})
+    layout = args.layout or previous_manifest.get('layout', 'flat')
+    options['layout'] = layout
+    options['output_dir'] = output_dir
+    if args.shard:
+        journal_path = shard_dir(*args.shard, root) / 'batch_journal.jsonl'
+        journal_path.parent.mkdir(parents=True, exist_ok=True)
+
+    journaled = {}
+    if args.resume:
+        journaled = load_journal(journal_path)
+        print(f'Resuming: {len(journaled)} outputs already journaled')
+    elif journal_path.exists():
+        print('Discarding the journal of an unfinished run (use --resume to continue it)')
+        journal_path.unlink()
+
+    row_count = 0
+    invalid_rows = 0
+
+    def counted(planned):
+        nonlocal row_count, invalid_rows
+        for row, row_plan in planned:
+            row_count += 1
+            invalid_rows += bool(row_plan['name_problems'])
+            yield row, row_plan
+
+    owners = output_owners(counted(plan_rows(csv_file)))
+    if invalid_rows:
+        print(f'{invalid_rows} titles have names that are not toki pona '
+              f'({"reported as failures" if args.strict else "rendered anyway"}; '
+              f'list them with --validate)')
+    if args.shard:
+        # Shard by the QID of the row that owns each output, so rows sharing
+        # an output always land in the same shard.
+        index, count = args.shard
+        owners = {name: owner for name, owner in owners.items()
+                  if shard_of(owner[1]['qid'], count) == index}
+        print(f'Shard {index}/{count}')
+
+    manifest = {}
+    errors = {}  # output filename -> error
+    to_render = []
+    relocated = 0
+    for name, (i, row, row_plan) in sorted(owners.items(), key=lambda item: item[1][0]):
+        if args.strict and row_plan['name_problems']:
+            errors[name] = f'name is not toki pona: {describe_problems(row_plan["name_problems"])}'
+            continue
+        entry = {
+            'label': row['label'],
+            'hash': render_hash(row['label'], row_plan['assets'], options),
+            'assets': row_plan['assets'],
+            'path': output_relpath(name, layout),
+        }
+        if name in previous and entry_path(name, previous[name]) != entry['path']:
+            # Switching layouts moves the existing files instead of re-rendering
+            relocate(output_dir, entry_path(name, previous[name]), entry['path'])
+            previous[name] = {**previous[name], 'path': entry['path']}
+            relocated += 1
+        record = journaled.get(name)
+        if record and record['hash'] == entry['hash'] and record['error']:
+            errors[name] = record['error']
+            continue
+        forced = args.force or not rebuild_assets.isdisjoint(entry['assets'])
+        if is_up_to_date(output_dir, name, entry, record) or (
+                not forced and is_up_to_date(output_dir, name, entry, previous.get(name))):
+            manifest[name] = entry
+        else:
+            to_render.append((name, row, entry))
+
+    if relocated:
+        print(f'Moved {relocated} outputs to the {layout} layout')
+    print(f'{len(owners)} outputs for {row_count} titles: '
+          f'{len(manifest)} up to date, {len(to_render)} to render'
+          f'{f", {len(errors)} failed" if errors else ""}')
+    print(f'Generating {len(to_render)} SVGs'
+          f'{f" with {jobs} workers" if jobs > 1 else ""}...\n')
+
+    rendered = 0
+    timing = {}
+    results = iter_results((row for _, row, _ in to_render), len(to_render),
+                           options, jobs, args.chunk_size, args.writer_threads, timing)
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        for (name, _, entry), (row, output_name, error) in zip(to_render, results):
+            if error:
+                errors[name] = error
+            else:
+                manifest[name] = entry
+                rendered += 1
+            journal.write(json.dumps({
+                'output': name,
+                'qid': row['qid'],
+                'tok_title': row['tok_title'],
+                **entry,
+                'error': error,
+            }, ensure_ascii=False) + '\n')
+            journal.flush()
+
+    # Compact: index every row that has an output, in CSV order
+    index_rows, failed = index_outputs(plan_rows(csv_file), owners, errors)
+
+    if args.shard:
+        write_shard(shard_dir(*args.shard, root), args.shard, index_rows, failed, manifest,
+                    owners, layout)
+    else:
+        finish(index_rows, failed, manifest, previous, owners, args.prune, layout, root)
+    journal_path.unlink()
+
+    report_timing(timing, args.writer_threads)
+    if STAGE_TIMES.calls:
+        print(f'\nTime per stage{" (summed over workers)" if jobs > 1 else ""}:')
+        print(STAGE_TIMES.table())
+    if args.timings:
+        with open(args.timings, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': jobs, 'writer_threads': args.writer_threads,
+                       'rendered': rendered, 'chunks': {k: round(v, 4) for k, v in timing.items()},
+                       **STAGE_TIMES.as_dict()}, f, indent=1)
+        print(f'Wrote {args.timings}')
+    if jobs == 1:
+        stats = ASSETS.stats()
+        print(f'Glyph assets: {stats["entries"]} cached, {stats["hits"]} hits, '
+              f'{stats["misses"]} misses, {stats["evictions"]} evictions')
+
+    print(f'\nDone! {len(index_rows)} succeeded ({rendered} rendered), '
+          f'{len(failed)} failed.')
+    report_failures(failed)
+    return failed
+
+
+def profile_run(args):
+    """run() under cProfile (--profile) and/or tracemalloc (--tracemalloc).
+
+    Rendering happens in this process so that it shows up in the profile.
+    """
+    if args.jobs != 1:
+        print('Profiling: rendering in this process (--jobs 1)')
+        args.jobs = 1
+    if args.tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        return run(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            args.profile.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(args.profile)
+            print(f'\nTop {PROFILE_TOP} functions by cumulative time:')
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            print(f'Wrote {args.profile} (browse with: python -m pstats {args.profile})')
+        if args.tracemalloc:
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'\nPython heap: {current / 1e6:.1f} MB at the end, {peak / 1e6:.1f} MB peak')
+            print(f'Top {TRACEMALLOC_TOP} allocation sites by growth during the run:')
+            for stat in after.compare_to(before, 'lineno')[:TRACEMALLOC_TOP]:
+                print(f'  {stat}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='worker processes (0 = one per CPU, default 1)')
+    parser.add_argument('--root', type=Path, default=ROOT_DIR,
+                        help='directory holding data/ and output/ (default: the repository)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'rows per worker task (default {CHUNK_SIZE})')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every output, ignoring the manifest')
+    parser.add_argument('--prune', action='store_true',
+                        help='delete outputs whose label is no longer in the CSV')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run, skipping outputs in its journal')
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help='render only shard i of N, into data/shards/<i>-of-<N>/')
+    parser.add_argument('--merge', action='store_true',
+                        help='combine the results in data/shards/ into the canonical files')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--symbols', action='store_true',
+                      help='write each distinct glyph once as a <symbol> and place it with <use>')
+    mode.add_argument('--bake', action='store_true',
+                      help='apply transforms to the path coordinates and write compact relative paths')
+    parser.add_argument('--precision', type=parse_precision, default=2,
+                        help=f'decimals kept in baked path data, 0 to {MAX_PRECISION} (default 2)')
+    parser.add_argument('--rebuild-assets', nargs='+', metavar='ASSET', default=[],
+                        help='re-render every output that uses one of these assets')
+    parser.add_argument('--layout', type=parse_layout,
+                        help="output/ layout: 'flat', or 'hash[:N]' for subdirectories named "
+                             "by N hex digits of the filename's hash (default: the "
+                             "manifest's layout, else flat)")
+    parser.add_argument('--writer-threads', type=int, default=0,
+                        help='threads per process writing files while rendering continues, '
+                             f'such as {WRITER_THREADS} for slow disks (default 0: write '
+                             'synchronously, which is faster when writes go to the page cache)')
+    parser.add_argument('--validate', action='store_true',
+                        help='list the labels whose names are not toki pona and exit')
+    parser.add_argument('--strict', action='store_true',
+                        help='report labels whose names are not toki pona as failures '
+                             'instead of rendering them, and exit with status 1 if any '
+                             'title failed (also with --merge)')
+    parser.add_argument('--timings', type=Path, metavar='FILE',
+                        help='also write the time per pipeline stage to FILE as JSON')
+    parser.add_argument('--profile', type=Path, nargs='?', const=PROFILE_PATH, metavar='FILE',
+                        help='run under cProfile and save the stats '
+                             '(default build/batch.pstats)')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='trace Python allocations and report the peak and top sites')
+    args = parser.parse_args(argv)
+    failed = profile_run(args) if args.profile or args.tracemalloc else run(args)
+    if failed and args.strict:
+        sys.exit(1)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,203 @@
+"""
+Microbenchmark path parsing: the old per-token _path_bbox against CompiledPath.
+
+Runs both over the path data of the largest word glyphs in
+sitelen_seli_kiwen_svgs/ (by path data length), checks that the old bboxes
+match CompiledPath.control_bbox(), and prints the best time per glyph for
+each, along with the exact bbox (NumPy and pure Python).
+
+Usage:
+    python bench_path_parse.py
+    python bench_path_parse.py --glyphs 50 --repeat 20
+"""
+
+import argparse
+import re
+import timeit
+
+from generate_sitelen_kalama_pona import WORD_SVGS_DIR, read_svg_paths
+import svg_paths
+from svg_paths import CompiledPath
+
+
+def legacy_path_bbox(d):
+    """_path_bbox as it was before CompiledPath: one regex match per token."""
+    if not d:
+        return None
+    tokens = re.findall(r'[a-zA-Z]|[-+]?(?:\d*\.\d+|\d+)(?:[eE][-+]?\d+)?', d)
+    if not tokens:
+        return None
+
+    idx = 0
+    cmd = None
+    x = y = 0.0
+    start_x = start_y = 0.0
+    last_cx = last_cy = None
+    min_x = min_y = float('inf')
+    max_x = max_y = float('-inf')
+
+    def update(px, py):
+        nonlocal min_x, min_y, max_x, max_y
+        min_x = min(min_x, px)
+        min_y = min(min_y, py)
+        max_x = max(max_x, px)
+        max_y = max(max_y, py)
+
+    def read_numbers(n):
+        nonlocal idx
+        if idx + n > len(tokens):
+            return None
+        vals = tokens[idx:idx + n]
+        if any(re.match(r'[a-zA-Z]', v) for v in vals):
+            return None
+        idx += n
+        return [float(v) for v in vals]
+
+    while idx < len(tokens):
+        if re.match(r'[a-zA-Z]', tokens[idx]):
+            cmd = tokens[idx]
+            idx += 1
+        if cmd is None:
+            break
+
+        c = cmd
+        if c in ('Z', 'z'):
+            x, y = start_x, start_y
+            update(x, y)
+            cmd = None
+            continue
+
+        if c in ('M', 'm', 'L', 'l', 'T', 't'):
+            vals = read_numbers(2)
+            if not vals:
+                break
+            dx, dy = vals
+            if c.islower():
+                x += dx
+                y += dy
+            else:
+                x = dx
+                y = dy
+            if c in ('M', 'm'):
+                start_x, start_y = x, y
+                cmd = 'l' if c == 'm' else 'L'
+            update(x, y)
+        elif c in ('H', 'h'):
+            vals = read_numbers(1)
+            if not vals:
+                break
+            dx = vals[0]
+            x = x + dx if c == 'h' else dx
+            update(x, y)
+        elif c in ('V', 'v'):
+            vals = read_numbers(1)
+            if not vals:
+                break
+            dy = vals[0]
+            y = y + dy if c == 'v' else dy
+            update(x, y)
+        elif c in ('C', 'c'):
+            vals = read_numbers(6)
+            if not vals:
+                break
+            x1, y1, x2, y2, x3, y3 = vals
+            if c.islower():
+                x1 += x; y1 += y; x2 += x; y2 += y; x3 += x; y3 += y
+            update(x1, y1)
+            update(x2, y2)
+            x, y = x3, y3
+            update(x, y)
+            last_cx, last_cy = x2, y2
+        elif c in ('S', 's'):
+            vals = read_numbers(4)
+            if not vals:
+                break
+            x2, y2, x3, y3 = vals
+            if last_cx is None:
+                x1, y1 = x, y
+            else:
+                x1, y1 = 2 * x - last_cx, 2 * y - last_cy
+            if c.islower():
+                x2 += x; y2 += y; x3 += x; y3 += y
+            update(x1, y1)
+            update(x2, y2)
+            x, y = x3, y3
+            update(x, y)
+            last_cx, last_cy = x2, y2
+        elif c in ('Q', 'q'):
+            vals = read_numbers(4)
+            if not vals:
+                break
+            x1, y1, x2, y2 = vals
+            if c.islower():
+                x1 += x; y1 += y; x2 += x; y2 += y
+            update(x1, y1)
+            x, y = x2, y2
+            update(x, y)
+            last_cx, last_cy = x1, y1
+        elif c in ('A', 'a'):
+            vals = read_numbers(7)
+            if not vals:
+                break
+            x2, y2 = vals[5], vals[6]
+            if c.islower():
+                x2 += x; y2 += y
+            x, y = x2, y2
+            update(x, y)
+        else:
+            cmd = None
+
+    if min_x == float('inf'):
+        return None
+    return min_x, min_y, max_x, max_y
+
+
+def largest_glyphs(count):
+    """(name, [path d, ...]) for the `count` word glyphs with the most path data."""
+    glyphs = []
+    for svg_file in WORD_SVGS_DIR.glob('Sitelen seli kiwen - *.svg'):
+        paths, _ = read_svg_paths(svg_file)
+        ds = [p['d'] for p in paths if p.get('d')]
+        glyphs.append((sum(len(d) for d in ds), svg_file.stem.replace('Sitelen seli kiwen - ', ''), ds))
+    glyphs.sort(reverse=True)
+    return [(name, ds) for _, name, ds in glyphs[:count]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--glyphs', type=int, default=20,
+                        help='number of largest word glyphs to use (default 20)')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='timing repeats; the best one is reported (default 10)')
+    args = parser.parse_args()
+
+    glyphs = largest_glyphs(args.glyphs)
+    ds = [d for _, glyph_ds in glyphs for d in glyph_ds]
+    print(f'{len(glyphs)} glyphs ({", ".join(name for name, _ in glyphs[:5])}, ...), '
+          f'{len(ds)} paths, {sum(len(d) for d in ds) / 1024:.0f} KB of path data')
+
+    mismatches = [d for d in ds if legacy_path_bbox(d) != CompiledPath.parse(d).control_bbox()]
+    if mismatches:
+        print(f'WARNING: {len(mismatches)} paths have a different bbox')
+
+    # CompiledPath.parse, not the cached compile_path, so every run parses
+    cases = [
+        ('legacy _path_bbox', lambda: [legacy_path_bbox(d) for d in ds]),
+        ('CompiledPath.parse', lambda: [CompiledPath.parse(d) for d in ds]),
+        ('CompiledPath control bbox', lambda: [CompiledPath.parse(d).control_bbox() for d in ds]),
+        ('exact bbox (pure Python)',
+         lambda: [svg_paths._exact_bbox_python(CompiledPath.parse(d)) for d in ds]),
+    ]
+    if svg_paths.np is not None:
+        cases.append(('exact bbox (NumPy)',
+                      lambda: [svg_paths._exact_bbox_numpy(CompiledPath.parse(d)) for d in ds]))
+    baseline = None
+    for label, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f'  {label:<28} {best / len(glyphs) * 1e6:8.1f} us/glyph '
+              f'({baseline / best:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Benchmark suite for path bboxes, parsing, rendering, batch throughput and the font build.
+
+Each benchmark is timed several times in this process, each time looping
+for at least 0.2 s; the best time per unit (glyph, name, render, label,
+font build) is what gets compared. Results are saved as JSON together with
+the Python version and machine, so a baseline from before a change can be
+compared with a run after it. A benchmark whose input files are missing
+(the labels CSV, the cartouche SVG, ...) is skipped; one that fails any other
+way is an error, and makes run and compare exit with status 1:
+
+    path_bbox         _path_bbox() on the largest word glyphs (path cache cleared)
+    parse_syllables   parse_syllables() on every name in wikidata_toki_pona_names.txt
+    match_compounds   compound matching on every name in wikidata_toki_pona_names.txt
+    render_cold       render() of one label with fresh glyph assets and path cache
+    render_warm       render() of the same label with everything loaded
+    batch             the batch pipeline (iter_results) on a fixed label sample,
+                      writing into a temporary directory
+    build_font        build_font.main(), writing into a temporary directory
+
+Usage:
+    python benchmarks.py run                          # save to build/benchmarks/latest.json
+    python benchmarks.py run --output before.json --only path_bbox render_warm
+    python benchmarks.py compare before.json          # run now and compare
+    python benchmarks.py compare before.json after.json --threshold 5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+import generate_sitelen_kalama_pona as gen
+from svg_paths import compile_path
+
+SCRIPT_DIR = Path(__file__).parent
+ROOT_DIR = SCRIPT_DIR.parent
+
+NAMES_FILE = ROOT_DIR / 'data' / 'wikidata_toki_pona_names.txt'
+LABELS_CSV = ROOT_DIR / 'data' / 'wikidata_tok_labels.csv'
+RESULTS_DIR = ROOT_DIR / 'build' / 'benchmarks'
+
+RENDER_LABEL = 'jan sewi Amatelasu'
+BBOX_GLYPHS = 20
+BATCH_SAMPLE = 300
+THRESHOLD = 10.0  # percent
+
+
+class MissingInput(Exception):
+    """A benchmark's input file is not there; the benchmark is skipped."""
+
+
+def require(*paths):
+    for path in paths:
+        if not path.exists():
+            raise MissingInput(f'{path} not found')
+
+
+def names():
+    require(NAMES_FILE)
+    with open(NAMES_FILE, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def bench_path_bbox():
+    from bench_path_parse import largest_glyphs
+
+    require(gen.WORD_SVGS_DIR)
+    ds = [d for _, glyph_ds in largest_glyphs(BBOX_GLYPHS) for d in glyph_ds]
+
+    def run():
+        compile_path.cache_clear()
+        for d in ds:
+            gen._path_bbox(d)
+
+    return run, BBOX_GLYPHS, 'glyph'
+
+
+def bench_parse_syllables():
+    sound_names = [gen.parse_input(name)[1] for name in names()]
+
+    def run():
+        for sound_name in sound_names:
+            if sound_name:
+                gen.parse_syllables(sound_name)
+
+    return run, len(sound_names), 'name'
+
+
+def bench_match_compounds():
+    token_lists = [gen.parse_input(name)[0] for name in names()]
+    compounds = gen.ASSETS.compound_index()
+
+    def run():
+        for tokens in token_lists:
+            gen.match_compounds(tokens, compounds)
+
+    return run, len(token_lists), 'name'
+
+
+def bench_render_cold():
+    require(gen.CARTOUCHE_SVG)
+
+    def run():
+        compile_path.cache_clear()
+        gen.render(RENDER_LABEL, gen.GlyphAssets())
+
+    return run, 1, 'render'
+
+
+def bench_render_warm():
+    require(gen.CARTOUCHE_SVG)
+    gen.render(RENDER_LABEL, gen.ASSETS)
+
+    def run():
+        gen.render(RENDER_LABEL, gen.ASSETS)
+
+    return run, 1, 'render'
+
+
+def bench_batch(jobs=1):
+    import batch_generate_svgs
+
+    require(LABELS_CSV)
+    rows = list(batch_generate_svgs.read_rows(LABELS_CSV))
+    # Every n-th row, so the sample is fixed but spread over the corpus
+    step = max(1, len(rows) // BATCH_SAMPLE)
+    sample = rows[::step][:BATCH_SAMPLE]
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            options = {'symbols': False, 'bake': False, 'output_dir': Path(tmp)}
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in batch_generate_svgs.iter_results(sample, len(sample), options, jobs):
+                    pass
+
+    return run, len(sample), 'label'
+
+
+def bench_build_font():
+    import build_font
+
+    require(build_font.SFDIR)
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_font.main(Path(tmp))
+
+    return run, 1, 'build'
+
+
+# name -> (setup returning (function, units, unit name), repeats)
+BENCHMARKS = {
+    'path_bbox': (bench_path_bbox, 5),
+    'parse_syllables': (bench_parse_syllables, 5),
+    'match_compounds': (bench_match_compounds, 5),
+    'render_cold': (bench_render_cold, 5),
+    'render_warm': (bench_render_warm, 5),
+    'batch': (bench_batch, 3),
+    'build_font': (bench_build_font, 3),
+}
+
+
+def run_benchmark(name, jobs=1):
+    setup, repeat = BENCHMARKS[name]
+    try:
+        func, units, unit = setup(jobs) if name == 'batch' else setup()
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        times = [t / number for t in timer.repeat(number=number, repeat=repeat)]
+    except MissingInput as exc:
+        return {'skipped': str(exc)}
+    except Exception as exc:
+        return {'error': f'{type(exc).__name__}: {exc}'}
+    best = min(times)
+    return {
+        'unit': unit,
+        'units': units,
+        'number': number,
+        'repeat': repeat,
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'per_unit_us': best / units * 1e6,
+    }
+
+
+def run_all(selected, jobs=1):
+    results = {}
+    for name in selected:
+        start = time.perf_counter()
+        result = run_benchmark(name, jobs)
+        results[name] = result
+        if 'skipped' in result:
+            print(f'  {name:<16} skipped: {result["skipped"]}')
+        elif 'error' in result:
+            print(f'  {name:<16} ERROR: {result["error"]}')
+        else:
+            print(f'  {name:<16} {result["per_unit_us"]:12.1f} us/{result["unit"]:<7} '
+                  f'(best of {result["repeat"]}, {time.perf_counter() - start:.1f} s)')
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs',
+        'jobs': jobs,
+        'benchmarks': results,
+    }
+
+
+def errors(results):
+    return [name for name, result in results['benchmarks'].items() if 'error' in result]
+
+
+def compare(baseline, current, threshold):
+    """Print a comparison table. Returns the names that regressed or failed."""
+    regressions = []
+    print(f'{"benchmark":<16} {"baseline":>12} {"current":>12} {"change":>8}')
+    for name in BENCHMARKS:
+        before = baseline['benchmarks'].get(name)
+        after = current['benchmarks'].get(name)
+        if not before or not after:
+            continue
+        if 'error' in after:
+            print(f'{name:<16} {"ERROR":>34}')
+            regressions.append(name)
+            continue
+        if 'per_unit_us' not in before or 'per_unit_us' not in after:
+            print(f'{name:<16} {"(skipped)":>34}')
+            continue
+        change = (after['per_unit_us'] / before['per_unit_us'] - 1) * 100
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f'{name:<16} {before["per_unit_us"]:10.1f}us {after["per_unit_us"]:10.1f}us '
+              f'{change:+7.1f}%{flag}')
+    if baseline.get('machine') != current.get('machine'):
+        print(f'Note: baseline is from {baseline.get("machine")}, '
+              f'current from {current.get("machine")}')
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(path, results):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f'Wrote {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help='run the benchmarks and save the results')
+    run_parser.add_argument('--output', type=Path, default=RESULTS_DIR / 'latest.json')
+    compare_parser = sub.add_parser('compare', help='compare results against a baseline')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('current', type=Path, nargs='?',
+                                help='results to compare (default: run the benchmarks now)')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help=f'percent slowdown counted as a regression (default {THRESHOLD:g})')
+    for sub_parser in (run_parser, compare_parser):
+        sub_parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='NAME',
+                                help=f'benchmarks to run ({", ".join(BENCHMARKS)})')
+        sub_parser.add_argument('--jobs', '-j', type=int, default=1,
+                                help='worker processes for the batch benchmark (default 1)')
+    args = parser.parse_args()
+    selected = args.only or list(BENCHMARKS)
+
+    if args.command == 'run':
+        results = run_all(selected, args.jobs)
+        save_results(args.output, results)
+        if errors(results):
+            print(f'\n{len(errors(results))} benchmarks failed: {", ".join(errors(results))}')
+            sys.exit(1)
+        return
+
+    baseline = load_results(args.baseline)
+    if args.current:
+        current = load_results(args.current)
+    else:
+        selected = [name for name in selected if name in baseline['benchmarks']]
+        current = run_all(selected, args.jobs)
+        save_results(RESULTS_DIR / 'latest.json', current)
+    print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regressions over {args.threshold:g}% or failures: '
+              f'{", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
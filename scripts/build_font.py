@@ -140,7 +140,10 @@ def make_notdef_charstring():
     return cs
 
 
-def main():
+def main(fonts_dir=None):
+    """Build the font into fonts_dir (default fonts/)."""
+    if fonts_dir is None:
+        fonts_dir = ROOT_DIR / 'fonts'
     print('Building sitelen kalama pona font...')
 
     glyph_data = {}
@@ -200,14 +203,14 @@ def main():
     })
     fb.setupPost()
 
-    otf_path = ROOT_DIR / 'fonts' / 'sitelen-kalama-pona.otf'
+    otf_path = fonts_dir / 'sitelen-kalama-pona.otf'
     fb.font.save(str(otf_path))
     print(f'\nWrote {otf_path}')
 
     # Also save as woff2
     try:
         fb.font.flavor = 'woff2'
-        woff2_path = ROOT_DIR / 'fonts' / 'sitelen-kalama-pona.woff2'
+        woff2_path = fonts_dir / 'sitelen-kalama-pona.woff2'
         fb.font.save(str(woff2_path))
         print(f'Wrote {woff2_path}')
     except Exception as exc:
@@ -0,0 +1,151 @@
+"""
+Compile the glyph SVGs used by generate_sitelen_kalama_pona.py into one bundle.
+
+Reads every SVG in sitelen_seli_kiwen_svgs/ and uniform_syllables/ plus the
+cartouche SVG, and writes build/glyph_bundle.bin with their path data,
+viewBoxes, precomputed bboxes and the compound name set. The generator loads
+the bundle with a single read and rebuilds it automatically when any source
+file is added, removed or changed (mtime/size first, then content hash).
+Files that were only touched get their new mtime recorded, so the next load
+does not hash them again.
+
+Usage:
+    python build_glyph_bundle.py
+"""
+
+import hashlib
+import marshal
+import os
+from pathlib import Path
+
+import generate_sitelen_kalama_pona as gen
+
+BUNDLE_MAGIC = b'SKPGLYPH'
+BUNDLE_VERSION = 2
+
+
+def list_sources():
+    """All SVG files that go into the bundle, keyed by gen.source_key()."""
+    files = sorted(gen.WORD_SVGS_DIR.glob('Sitelen seli kiwen - *.svg'))
+    files += sorted(gen.SYLLABLES_DIR.glob('sitelen kalama pona - *.svg'))
+    if gen.CARTOUCHE_SVG.exists():
+        files.append(gen.CARTOUCHE_SVG)
+    return {gen.source_key(f): f for f in files}
+
+
+def _file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def build_bundle(bundle_path=None):
+    """Parse all source SVGs and write the bundle. Returns the bundle dict."""
+    bundle_path = Path(bundle_path or gen.BUNDLE_PATH)
+    sources = list_sources()
+
+    words = {}
+    syllables = {}
+    cartouche = None
+    source_table = {}
+    for key, path in sources.items():
+        st = path.stat()
+        source_table[key] = (st.st_mtime_ns, st.st_size, _file_sha256(path))
+
+        if path == gen.CARTOUCHE_SVG:
+            try:
+                cartouche = gen._load_cartouche()
+            except (FileNotFoundError, ValueError):
+                cartouche = None
+        elif path.parent == gen.WORD_SVGS_DIR:
+            words[path.stem.replace('Sitelen seli kiwen - ', '')] = gen._load_asset(path)
+        else:
+            syllables[path.stem.replace('sitelen kalama pona - ', '')] = gen._load_asset(path)
+
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'cartouche_file': gen.CARTOUCHE_SVG.name,
+        'sources': source_table,
+        'words': words,
+        'syllables': syllables,
+        'cartouche': cartouche,
+        'compounds': sorted(name for name in words if '-' in name),
+    }
+
+    write_bundle(bundle, bundle_path)
+    return bundle
+
+
+def write_bundle(bundle, bundle_path):
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = bundle_path.with_name(f'{bundle_path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(BUNDLE_MAGIC + marshal.dumps(bundle))
+    os.replace(tmp_path, bundle_path)
+
+
+def read_bundle(bundle_path=None):
+    """Read the bundle in one go. Returns None if it is missing or unreadable."""
+    bundle_path = Path(bundle_path or gen.BUNDLE_PATH)
+    try:
+        data = bundle_path.read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(BUNDLE_MAGIC):
+        return None
+    try:
+        bundle = marshal.loads(data[len(BUNDLE_MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(bundle, dict) or bundle.get('version') != BUNDLE_VERSION:
+        return None
+    return bundle
+
+
+def touched_sources(bundle):
+    """Check the bundle's source table against the files on disk.
+
+    Returns None if a source was added, removed or changed, else the
+    source table records of files that were only touched (same size and
+    content, e.g. after a fresh git checkout) with their new mtime.
+    """
+    sources = list_sources()
+    recorded = bundle['sources']
+    if set(sources) != set(recorded):
+        return None
+    touched = {}
+    for key, path in sources.items():
+        mtime_ns, size, digest = recorded[key]
+        st = path.stat()
+        if st.st_size != size:
+            return None
+        if st.st_mtime_ns != mtime_ns:
+            if _file_sha256(path) != digest:
+                return None
+            touched[key] = (st.st_mtime_ns, size, digest)
+    return touched
+
+
+def load_bundle(bundle_path=None):
+    """Load the bundle, rebuilding it first if it is missing or stale."""
+    bundle_path = Path(bundle_path or gen.BUNDLE_PATH)
+    bundle = read_bundle(bundle_path)
+    touched = touched_sources(bundle) if bundle is not None else None
+    if touched is None:
+        bundle = build_bundle(bundle_path)
+    elif touched:
+        bundle['sources'].update(touched)
+        write_bundle(bundle, bundle_path)
+    return bundle
+
+
+def main():
+    bundle = build_bundle()
+    size = gen.BUNDLE_PATH.stat().st_size
+    print(f'Bundled {len(bundle["words"])} word SVGs '
+          f'({len(bundle["compounds"])} compounds), '
+          f'{len(bundle["syllables"])} syllable SVGs, '
+          f'cartouche: {"yes" if bundle["cartouche"] else "missing"}')
+    print(f'Wrote {gen.BUNDLE_PATH} ({size / 1024:.0f} KB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,51 @@
 """Extract all glyphs from sitelen-seli-kiwen.woff2 into individual SVG files.
 
-Uses uharfbuzz to discover compound word glyphs via ZWJ shaping.
+Compound word glyphs (words joined by ZWJ) are discovered by walking the
+font's GSUB ligature and contextual lookups, so compounds of any length are
+found without shaping. --verify also shapes every word pair and each found
+compound with uharfbuzz and reports where the two disagree.
+
+Extraction is incremental: data/sitelen_seli_kiwen_manifest.json records the
+font's hash and a hash of each glyph's SVG. When the font is unchanged the
+run stops there; otherwise the glyphs are drawn by a pool of worker
+processes (--jobs), and only files whose outline changed are (atomically)
+rewritten, so unchanged files keep their mtimes. The run lists the word and
+compound files added, changed and no longer in the font (deleted with
+--prune), with the asset_dependents.py command that rebuilds the outputs
+using them.
 Outputs files named to match Wikimedia Commons conventions:
   - Individual: 'Sitelen seli kiwen - jan.svg'
   - Compound:   'Sitelen seli kiwen - jan-sewi.svg'
+
+Usage:
+    python extract_sitelen_seli_kiwen.py
+    python extract_sitelen_seli_kiwen.py --font path/to/sitelen-seli-kiwen.woff2 --verify
+    python extract_sitelen_seli_kiwen.py --force --jobs 4
 """
-import sys, io, os, tempfile
+import sys, io, os, argparse, hashlib, json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
 from pathlib import Path
 from fontTools.ttLib import TTFont
 from fontTools.pens.svgPathPen import SVGPathPen
-import uharfbuzz as hb
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from output_writer import atomic_write
+
+# Only re-wrap when needed, as generate_sitelen_kalama_pona.py does, so that
+# importing this module (e.g. from tests) keeps a UTF-8 stdout as it is
+if sys.stdout and hasattr(sys.stdout, 'buffer') and (sys.stdout.encoding or '').lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 SCRIPT_DIR = Path(__file__).parent
 ROOT_DIR = SCRIPT_DIR.parent
 FONT_PATH = ROOT_DIR / 'fonts' / 'sitelen-seli-kiwen.woff2'
 OUTPUT_DIR = ROOT_DIR / 'sitelen_seli_kiwen_svgs'
+MANIFEST_PATH = ROOT_DIR / 'data' / 'sitelen_seli_kiwen_manifest.json'
+SVG_PREFIX = 'Sitelen seli kiwen - '
+
+# Bump when a change here alters the SVGs written for the same font
+EXTRACT_VERSION = 1
+CHUNK_SIZE = 32
 
 # Word -> F19xx codepoint
 WORDS = {
@@ -60,6 +89,9 @@ WORDS = {
 
 ZWJ = 0x200D
 
+# Features whose lookups HarfBuzz applies to ZWJ sequences by default
+GSUB_FEATURES = {'ccmp', 'locl', 'rlig', 'liga', 'clig', 'calt', 'rclt'}
+
 
 def extract_glyph_svg_by_name(font, glyph_set, glyph_name):
     """Extract a glyph by its internal name as SVG."""
@@ -84,86 +116,320 @@ def extract_glyph_svg_by_name(font, glyph_set, glyph_name):
     return svg
 
 
-def find_compounds_via_harfbuzz(font_path, ttfont):
-    """Use harfbuzz to find all 2-word ZWJ compounds."""
-    # Save as TTF for harfbuzz (it can't read WOFF2 cmap properly)
-    tmp = tempfile.NamedTemporaryFile(suffix='.ttf', delete=False)
-    tmp_path = tmp.name
-    tmp.close()
-    ttfont_copy = TTFont(str(font_path))
-    ttfont_copy.flavor = None
-    ttfont_copy.save(tmp_path)
-    ttfont_copy.close()
-
-    with open(tmp_path, 'rb') as f:
-        font_data = f.read()
-    os.unlink(tmp_path)
-
-    blob = hb.Blob(font_data)
-    face = hb.Face(blob)
-    hb_font = hb.Font(face)
-    glyph_order = ttfont.getGlyphOrder()
-    word_list = sorted(WORDS.keys())
-
-    compounds = {}
+def _subtables(lookup):
+    """(lookup type, subtable) pairs, unwrapping extension subtables."""
+    for subtable in lookup.SubTable:
+        if lookup.LookupType == 7:
+            yield subtable.ExtensionLookupType, subtable.ExtSubTable
+        else:
+            yield lookup.LookupType, subtable
+
+
+def _nested_lookups(subtable):
+    """Indices of the lookups a contextual (type 5/6) subtable applies."""
+    records = list(getattr(subtable, 'SubstLookupRecord', None) or [])
+    for set_name, rule_name in (('SubRuleSet', 'SubRule'), ('SubClassSet', 'SubClassRule'),
+                                ('ChainSubRuleSet', 'ChainSubRule'),
+                                ('ChainSubClassSet', 'ChainSubClassRule')):
+        for rule_set in getattr(subtable, set_name, None) or []:
+            for rule in (getattr(rule_set, rule_name, None) or []) if rule_set else []:
+                records.extend(rule.SubstLookupRecord)
+    return list(dict.fromkeys(record.LookupListIndex for record in records))
+
+
+def _is_compound(sequence):
+    """word ZWJ word [ZWJ word ...]"""
+    return (len(sequence) >= 3 and len(sequence) % 2 == 1
+            and all(token is None for token in sequence[1::2])
+            and None not in sequence[::2])
+
+
+def find_compounds_via_gsub(ttfont):
+    """Find all ZWJ compounds of any length from the GSUB table.
+
+    Follows the lookups of GSUB_FEATURES in order, tracking for each glyph
+    the token sequences (words, and None for ZWJ) it can stand for: a
+    ligature stands for the concatenation of its components', a single
+    substitution for its input's. Lookups applied by contextual rules are
+    followed as if their context matched, so a font with context-dependent
+    compounds can yield extras; --verify catches those. Each lookup is read
+    once.
+
+    Returns {compound name: glyph name} with the glyph the compound ends
+    up as after the last lookup.
+    """
+    cmap = ttfont.getBestCmap()
+    sequences = {}  # glyph name -> set of token tuples
+    for word, cp in WORDS.items():
+        if cp in cmap:
+            sequences.setdefault(cmap[cp], set()).add((word,))
+    if ZWJ not in cmap or 'GSUB' not in ttfont:
+        return {}
+    sequences.setdefault(cmap[ZWJ], set()).add((None,))
+
+    gsub = ttfont['GSUB'].table
+    lookups = gsub.LookupList.Lookup if gsub.LookupList else []
+    feature_lookups = sorted({
+        index
+        for record in (gsub.FeatureList.FeatureRecord if gsub.FeatureList else [])
+        if record.FeatureTag in GSUB_FEATURES
+        for index in record.Feature.LookupListIndex
+    })
+    compounds = {}  # token tuple -> glyph name
+
+    def produce(glyph, new_sequences):
+        sequences.setdefault(glyph, set()).update(new_sequences)
+        for sequence in new_sequences:
+            if _is_compound(sequence):
+                compounds[sequence] = glyph
+
+    def apply(index, depth=0):
+        for lookup_type, subtable in _subtables(lookups[index]):
+            if lookup_type == 1:
+                for glyph, replacement in subtable.mapping.items():
+                    if glyph in sequences:
+                        produce(replacement, list(sequences[glyph]))
+            elif lookup_type == 4:
+                for first, ligatures in subtable.ligatures.items():
+                    for ligature in ligatures:
+                        components = [first, *ligature.Component]
+                        if all(glyph in sequences for glyph in components):
+                            produce(ligature.LigGlyph, [
+                                sum(parts, ())
+                                for parts in product(*(list(sequences[glyph])
+                                                       for glyph in components))
+                            ])
+            elif lookup_type in (5, 6) and depth < 8:
+                for nested in _nested_lookups(subtable):
+                    apply(nested, depth + 1)
+
+    for index in feature_lookups:
+        apply(index)
+    return {'-'.join(sequence[::2]): glyph for sequence, glyph in compounds.items()}
+
+
+def shape_font(ttfont):
+    """A uharfbuzz font for ttfont, decompressed in memory (HarfBuzz cannot read WOFF2)."""
+    import uharfbuzz as hb
+
+    data = io.BytesIO()
+    flavor = ttfont.flavor
+    ttfont.flavor = None
+    try:
+        ttfont.save(data)
+    finally:
+        ttfont.flavor = flavor
+    return hb.Font(hb.Face(hb.Blob(data.getvalue())))
+
+
+def shape_compound(hb_font, ttfont, words):
+    """Glyph name that words joined by ZWJ shape to, or None if not a single glyph."""
+    import uharfbuzz as hb
+
+    codepoints = []
+    for word in words:
+        codepoints += [WORDS[word], ZWJ]
+    buf = hb.Buffer()
+    buf.add_codepoints(codepoints[:-1])
+    buf.guess_segment_properties()
+    hb.shape(hb_font, buf, {'calt': True, 'liga': True, 'rlig': True})
+    infos = buf.glyph_infos
+    if len(infos) != 1:
+        return None
+    return ttfont.getGlyphOrder()[infos[0].codepoint]
+
+
+def verify_compounds(ttfont, compounds):
+    """Check compounds against HarfBuzz shaping; returns the number of mismatches.
+
+    Shapes every found compound, and every ordered word pair to catch
+    two-word compounds the GSUB walk missed.
+    """
+    hb_font = shape_font(ttfont)
+    mismatches = 0
+    for name, glyph_name in sorted(compounds.items()):
+        shaped = shape_compound(hb_font, ttfont, name.split('-'))
+        if shaped != glyph_name:
+            print(f'  MISMATCH: {name} is {glyph_name} in GSUB, {shaped} when shaped')
+            mismatches += 1
+    cmap = ttfont.getBestCmap()
+    word_list = sorted(word for word, cp in WORDS.items() if cp in cmap)
     for w1 in word_list:
         for w2 in word_list:
-            buf = hb.Buffer()
-            buf.add_codepoints([WORDS[w1], ZWJ, WORDS[w2]])
-            buf.guess_segment_properties()
-            hb.shape(hb_font, buf, {'calt': True, 'liga': True, 'rlig': True})
-            infos = buf.glyph_infos
-            if len(infos) == 1:
-                gid = infos[0].codepoint
-                gname = glyph_order[gid]
-                compounds[f'{w1}-{w2}'] = gname
+            name = f'{w1}-{w2}'
+            if name not in compounds:
+                shaped = shape_compound(hb_font, ttfont, [w1, w2])
+                if shaped is not None:
+                    print(f'  MISSED: {name} shapes to {shaped}')
+                    mismatches += 1
+    return mismatches
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == EXTRACT_VERSION else {}
+
+
+def save_manifest(path, font_hash, glyphs):
+    # One line per glyph, as in output_manifest.json
+    lines = [f'  {json.dumps(name)}: {json.dumps(entry)}' for name, entry in sorted(glyphs.items())]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{\n "version": {EXTRACT_VERSION},\n "font_sha256": {json.dumps(font_hash)},\n'
+                f' "glyphs": {{\n')
+        f.write(',\n'.join(lines))
+        f.write('\n }\n}\n')
+
+
+_FONT = None
+
+
+def _init_worker(font_path):
+    global _FONT
+    _FONT = TTFont(str(font_path))
+
 
-    return compounds
+def _extract_chunk(chunk, output_dir):
+    """Draw (name, glyph name, previous hash) glyphs and write the changed files.
+
+    Returns (name, hash, status) per glyph: hash is None for a glyph without
+    outlines, status is 'added', 'changed' or None (file already up to date).
+    """
+    glyph_set = _FONT.getGlyphSet()
+    results = []
+    for name, glyph_name, previous in chunk:
+        svg = extract_glyph_svg_by_name(_FONT, glyph_set, glyph_name)
+        if svg is None:
+            results.append((name, None, None))
+            continue
+        data = svg.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = output_dir / f'{SVG_PREFIX}{name}.svg'
+        status = None
+        if digest != previous or not path.exists():
+            if not path.exists():
+                status = 'added'
+            elif path.read_bytes() != data:
+                status = 'changed'
+            if status:
+                atomic_write(path, data)
+        results.append((name, digest, status))
+    return results
+
+
+def extract(font, font_path, glyphs, previous, output_dir, jobs):
+    """Extract {name: glyph name}, skipping files whose outline hash is unchanged."""
+    items = [(name, glyph_name, previous.get(name, {}).get('hash'))
+             for name, glyph_name in sorted(glyphs.items())]
+    chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+    if jobs == 1:
+        global _FONT
+        _FONT = font
+        return [result for chunk in chunks for result in _extract_chunk(chunk, output_dir)]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(font_path,)) as pool:
+        return [result for results in pool.map(_extract_chunk, chunks, repeat(output_dir))
+                for result in results]
+
+
+def report(heading, names):
+    if not names:
+        return
+    words = sum('-' not in name for name in names)
+    print(f'\n{heading}: {words} words, {len(names) - words} compounds')
+    for name in names:
+        print(f'  {name}')
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--font', type=Path, default=FONT_PATH,
+                        help='font to extract (default fonts/sitelen-seli-kiwen.woff2)')
+    parser.add_argument('--verify', action='store_true',
+                        help='check the compounds found in GSUB by shaping with uharfbuzz')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help='worker processes drawing glyphs (0 = one per CPU, the default)')
+    parser.add_argument('--force', action='store_true',
+                        help='extract even if the font is unchanged since the last run')
+    parser.add_argument('--prune', action='store_true',
+                        help='delete SVGs of glyphs that are no longer in the font')
+    args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
     OUTPUT_DIR.mkdir(exist_ok=True)
 
-    font = TTFont(str(FONT_PATH))
-    glyph_set = font.getGlyphSet()
+    font_hash = file_hash(args.font)
+    manifest = load_manifest(MANIFEST_PATH)
+    previous = manifest.get('glyphs', {})
+    if (not (args.force or args.verify or args.prune) and manifest.get('font_sha256') == font_hash
+            and all((OUTPUT_DIR / f'{SVG_PREFIX}{name}.svg').exists() for name in previous)):
+        print(f'Font unchanged ({font_hash[:12]}): {len(previous)} SVGs up to date')
+        return
+
+    font = TTFont(str(args.font))
     cmap = font.getBestCmap()
 
-    # 1. Extract individual words
-    count = 0
+    # 1. Individual words
+    glyphs = {}  # SVG name -> glyph name
     for word, cp in sorted(WORDS.items()):
         if cp not in cmap:
             print(f'  SKIP: {word} (not in cmap)')
             continue
-        glyph_name = cmap[cp]
-        svg = extract_glyph_svg_by_name(font, glyph_set, glyph_name)
-        if svg:
-            filename = f'Sitelen seli kiwen - {word}.svg'
-            (OUTPUT_DIR / filename).write_text(svg, encoding='utf-8')
-            count += 1
-            print(f'  {word}')
-        else:
-            print(f'  SKIP: {word} (no path data)')
-
-    print(f'\nExtracted {count} individual word SVGs')
+        glyphs[word] = cmap[cp]
 
-    # 2. Find and extract compound glyphs via harfbuzz ZWJ shaping
-    print('\nDiscovering compound glyphs via harfbuzz...')
-    compounds = find_compounds_via_harfbuzz(FONT_PATH, font)
+    # 2. Compound glyphs from the GSUB ligatures
+    print('Discovering compound glyphs in GSUB...')
+    compounds = find_compounds_via_gsub(font)
     print(f'Found {len(compounds)} compounds')
+    if args.verify:
+        print('Verifying with harfbuzz...')
+        mismatches = verify_compounds(font, compounds)
+        print(f'{mismatches} mismatches' if mismatches else 'All compounds match')
+    glyphs.update(compounds)
 
-    compound_count = 0
-    for name, glyph_name in sorted(compounds.items()):
-        svg = extract_glyph_svg_by_name(font, glyph_set, glyph_name)
-        if svg:
-            filename = f'Sitelen seli kiwen - {name}.svg'
-            (OUTPUT_DIR / filename).write_text(svg, encoding='utf-8')
-            compound_count += 1
-            print(f'  {name}')
-
-    print(f'\nExtracted {compound_count} compound SVGs')
-    print(f'Total: {count + compound_count} SVGs saved to: {OUTPUT_DIR}')
+    print(f'\nDrawing {len(glyphs)} glyphs{f" with {jobs} workers" if jobs > 1 else ""}...')
+    entries = {}
+    changes = {'added': [], 'changed': []}
+    for name, digest, status in extract(font, args.font, glyphs, previous, OUTPUT_DIR, jobs):
+        if digest is None:
+            print(f'  SKIP: {name} (no path data)')
+            continue
+        entries[name] = {'glyph': glyphs[name], 'hash': digest}
+        if status:
+            changes[status].append(name)
     font.close()
 
+    existing = {path.stem[len(SVG_PREFIX):] for path in OUTPUT_DIR.glob(f'{SVG_PREFIX}*.svg')}
+    removed = sorted((existing | set(previous)) - set(entries))
+    if args.prune:
+        for name in removed:
+            (OUTPUT_DIR / f'{SVG_PREFIX}{name}.svg').unlink(missing_ok=True)
+
+    report('Added', changes['added'])
+    report('Changed', changes['changed'])
+    report('Deleted' if args.prune else 'Not in the font (use --prune to delete)', removed)
+    save_manifest(MANIFEST_PATH, font_hash, entries)
+    unchanged = len(entries) - len(changes['added']) - len(changes['changed'])
+    print(f'\n{len(entries)} SVGs in {OUTPUT_DIR}: {len(changes["added"])} added, '
+          f'{len(changes["changed"])} changed, {unchanged} unchanged, {len(removed)} '
+          f'{"deleted" if args.prune else "not in the font"}')
+    print(f'Wrote {MANIFEST_PATH}')
+    touched = changes['changed'] + (removed if args.prune else [])
+    if touched:
+        keys = ' '.join(f"{'compound' if '-' in name else 'word'}:{name}" for name in touched)
+        print(f'Rebuild the outputs that use them with:\n'
+              f'  python scripts/asset_dependents.py rebuild {keys}')
+
 
 if __name__ == '__main__':
     main()
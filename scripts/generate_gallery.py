@@ -1,17 +1,22 @@
 """
 Generate a gallery HTML page for the Wikidata-generated sitelen ilo pona SVGs.
 
-Produces gallery.html with a searchable grid of all output/ SVGs.
+Produces gallery.html with a searchable grid of all output/ SVGs, as listed
+(with their paths under output/) in data/output_manifest.json. Without a
+manifest, e.g. for SVGs from generate_sitelen_kalama_pona.py alone, it falls
+back to listing output/.
+
+Usage:
+    python generate_gallery.py
+    python generate_gallery.py --root /tmp/scale
 """
 
+import argparse
 import json
 from pathlib import Path
 from urllib.parse import quote
 
 ROOT_DIR = Path(__file__).parent.parent
-OUTPUT_DIR = ROOT_DIR / 'output'
-OUTPUT_FILE = ROOT_DIR / 'gallery.html'
-INDEX_FILE = ROOT_DIR / 'data' / 'output_index.json'
 
 PREFIX = 'sitelen ilo pona - '
 
@@ -23,23 +28,36 @@ def display_label(raw_label):
     return raw_label
 
 
-def main():
+def output_paths(root):
+    """Sorted (filename, path under output/) of the generated SVGs."""
+    manifest_file = root / 'data' / 'output_manifest.json'
+    if manifest_file.exists():
+        with open(manifest_file, encoding='utf-8') as f:
+            outputs = json.load(f)['outputs']
+        return sorted((name, entry.get('path', name)) for name, entry in outputs.items())
+    return sorted((f.name, f.name) for f in (root / 'output').glob('sitelen ilo pona - *.svg'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', type=Path, default=ROOT_DIR,
+                        help='directory holding data/ and output/; gallery.html is '
+                             'written there (default: the repository)')
+    args = parser.parse_args(argv)
+    output_file = args.root / 'gallery.html'
+    index_file = args.root / 'data' / 'output_index.json'
+
     index = {}
-    if INDEX_FILE.exists():
-        with open(INDEX_FILE, encoding='utf-8') as f:
+    if index_file.exists():
+        with open(index_file, encoding='utf-8') as f:
             index = json.load(f)
 
-    svgs = sorted(
-        f for f in OUTPUT_DIR.glob('sitelen ilo pona - *.svg')
-        if not f.name.endswith('.wiki.txt')
-    )
-
     cards = []
-    for svg_file in svgs:
-        raw_label = svg_file.stem[len(PREFIX):]
+    for name, path in output_paths(args.root):
+        raw_label = name[len(PREFIX):-len('.svg')]
         label = display_label(raw_label)
-        rel_path = 'output/' + quote(svg_file.name, safe=' ,()-')
-        entry = index.get(svg_file.name, {})
+        rel_path = 'output/' + quote(path, safe=' ,()-/')
+        entry = index.get(name, {})
         # Support old format (string) and new format (dict with qid + tok_title)
         if isinstance(entry, str):
             qid, tok_title = entry, ''
@@ -124,8 +142,8 @@ def main():
 </body>
 </html>'''
 
-    OUTPUT_FILE.write_text(html, encoding='utf-8')
-    print(f'Wrote gallery ({len(cards)} items) to {OUTPUT_FILE}')
+    output_file.write_text(html, encoding='utf-8')
+    print(f'Wrote gallery ({len(cards)} items) to {output_file}')
 
 
 if __name__ == '__main__':
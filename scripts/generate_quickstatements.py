@@ -1,82 +1,81 @@
 """
 Generate QuickStatements to add P18 (image) claims on Wikidata items.
 
-Reads data/wikidata_tok_labels.csv (qid, label) and output/ SVG files.
-For each QID whose label has a generated SVG in output/, emits a
-QuickStatements line to add the image on Wikimedia Commons as P18.
+Reads data/output_index.json and data/output_manifest.json (both written by
+batch_generate_svgs.py). For each QID that uses a generated SVG listed in the
+manifest (several QIDs can share one), emits a QuickStatements line to add
+the image on Wikimedia Commons as P18.
 
 Output: data/quickstatements.txt
 
 Usage:
     python scripts/generate_quickstatements.py
+    python scripts/generate_quickstatements.py --root /tmp/scale
 """
 
-import csv
-import re
+import argparse
+import json
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent.parent
-DATA_DIR = ROOT_DIR / 'data'
-OUTPUT_DIR = ROOT_DIR / 'output'
 
 COMMONS_BASE = 'https://commons.wikimedia.org/wiki/File:'
 
 
-def safe_filename(text):
-    """Produce a filesystem-safe version of text (mirrors generate_sitelen_kalama_pona.py)."""
-    return re.sub(r'[<>:"/\\|?*]', '_', text)
-
-
-def commons_filename(label):
-    """The expected Wikimedia Commons filename for a given label."""
-    # SVG files are named 'sitelen ilo pona - {label}.svg'
+def commons_filename(svg_name):
+    """The expected Wikimedia Commons filename for a generated SVG."""
     # Commons convention: capitalise first letter, underscores for spaces
-    name = f'Sitelen ilo pona - {label}.svg'
+    name = svg_name[:1].upper() + svg_name[1:]
     return name.replace(' ', '_')
 
 
-def main():
-    DATA_DIR.mkdir(exist_ok=True)
-    labels_path = DATA_DIR / 'wikidata_tok_labels.csv'
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', type=Path, default=ROOT_DIR,
+                        help='directory holding data/ (default: the repository)')
+    args = parser.parse_args(argv)
+    data_dir = args.root / 'data'
 
-    if not labels_path.exists():
-        print(f'Missing {labels_path} — run fetch_wikidata_sparql.py first')
-        return
+    data_dir.mkdir(exist_ok=True)
+    index_path = data_dir / 'output_index.json'
+    manifest_path = data_dir / 'output_manifest.json'
 
-    rows = []
-    with open(labels_path, 'r', encoding='utf-8', newline='') as f:
-        rows = list(csv.DictReader(f))
+    for path in (index_path, manifest_path):
+        if not path.exists():
+            print(f'Missing {path} — run batch_generate_svgs.py first')
+            return
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        generated = json.load(f)['outputs']
 
     lines = []
     skipped = 0
 
-    for row in rows:
-        qid = row['qid'].strip()
-        label = row['label'].strip()
-        if not qid or not label:
-            continue
+    for svg_name, entry in index.items():
+        qids = entry.get('qids') or [entry['qid']]
 
-        # Check if an SVG was generated for this label
-        svg_name = f'sitelen ilo pona - {safe_filename(label)}.svg'
-        svg_path = OUTPUT_DIR / svg_name
-        if not svg_path.exists():
-            skipped += 1
+        # Check that the SVG was generated
+        if svg_name not in generated:
+            skipped += len(qids)
             continue
 
-        cf = commons_filename(label)
-        commons_url = COMMONS_BASE + cf.replace(' ', '_')
+        cf = commons_filename(svg_name)
+        commons_url = COMMONS_BASE + cf
 
-        # QuickStatements V1 format:
-        # QID <tab> P18 <tab> "filename" <tab> S854 <tab> "source-url"
-        line = f'{qid}\tP18\t"{cf}"\tS854\t"{commons_url}"'
-        lines.append(line)
+        for qid in qids:
+            # QuickStatements V1 format:
+            # QID <tab> P18 <tab> "filename" <tab> S854 <tab> "source-url"
+            line = f'{qid}\tP18\t"{cf}"\tS854\t"{commons_url}"'
+            lines.append(line)
 
-    out_path = DATA_DIR / 'quickstatements.txt'
+    out_path = data_dir / 'quickstatements.txt'
     with open(out_path, 'w', encoding='utf-8') as f:
         f.write('\n'.join(lines) + '\n')
 
     print(f'Generated {len(lines)} QuickStatements lines '
-          f'({skipped} labels skipped — no SVG output).')
+          f'({skipped} QIDs skipped — no SVG output).')
     print(f'Wrote {out_path}')
     print()
     print('To apply: go to https://quickstatements.toolforge.org/ and paste the file contents.')
@@ -4,20 +4,40 @@ Generate sitelen kalama pona composed SVG images.
 Takes a toki pona phrase with a proper name like "jan sewi Amatelasu"
 and generates an SVG combining word symbols and sound symbols.
 
-Uses pre-extracted SVGs from sitelen_seli_kiwen_svgs/ and uniform_syllables/.
+Uses pre-extracted SVGs from sitelen_seli_kiwen_svgs/ and uniform_syllables/,
+read through the compiled glyph bundle (see build_glyph_bundle.py).
+
+With --stdin it keeps running and renders one phrase per input line, either
+plain text or a JSON object such as
+    {"id": 1, "text": "jan sewi Amatelasu", "inline": true, "symbols": true}
+and writes one JSON result per line: the request 'id' (if given), 'text',
+'filename' and either 'output' (path of the written SVG) or 'svg' (inline),
+or 'error'. Glyph assets stay loaded between requests.
 
 Usage:
     python generate_sitelen_kalama_pona.py "jan sewi Amatelasu"
     python generate_sitelen_kalama_pona.py "tomo sewi Isukusima"
+    python generate_sitelen_kalama_pona.py --stdin [--inline] < phrases.txt
 """
 
+import argparse
 import sys
 import io
+import hashlib
+import json
 import re
+import time
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from itertools import tee
 from pathlib import Path
 
-if sys.stdout and hasattr(sys.stdout, 'buffer'):
+from output_writer import atomic_write
+from svg_paths import compile_path, multiply, parse_transform
+
+# Re-wrapping only when needed keeps this safe when the module is imported a
+# second time (e.g. by build_glyph_bundle.py while running as __main__).
+if sys.stdout and hasattr(sys.stdout, 'buffer') and (sys.stdout.encoding or '').lower() != 'utf-8':
     try:
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     except Exception:
@@ -34,9 +54,37 @@ SPECIAL_COMMONS = {
 }
 
 CONSONANTS = set('mnptkwjls')
+
+# A syllable is an optional consonant, a vowel and an optional final n (when
+# no vowel follows it). A consonant without a vowel is kept as a syllable of
+# its own, and any other character is skipped.
+SYLLABLE_RE = re.compile(r'[mnptkwjls]?[aeiou](?:n(?![aeiou]))?|[mnptkwjls]')
+# The same, with the skipped characters as a third group, for syllabify()
+_SYLLABLE_SCAN_RE = re.compile(
+    r'([mnptkwjls]?[aeiou](?:n(?![aeiou]))?)|([mnptkwjls])|([^mnptkwjlsaeiou]+)')
+FORBIDDEN_SYLLABLES = {'ji', 'ti', 'wo', 'wu'}
 TARGET_HEIGHT = 1000
 SPACING = 80
 CARTOUCHE_SVG = ROOT_DIR / 'Jan_Sinpo_We_(Jimbo_Wales_in_Sitelen_Pona).svg'
+CARTOUCHE_LABELS = ('left', 'center', 'right')
+
+# Upper bound on parsed glyph assets held in memory at once. The full set of
+# words, compounds and syllables is ~640 files, so the default keeps every
+# glyph warm; lookups of glyphs that do not exist are not cached.
+ASSET_CACHE_SIZE = 1024
+BUNDLE_PATH = ROOT_DIR / 'build' / 'glyph_bundle.bin'
+
+# Bump whenever a change here alters the SVG or sidecar produced for the same
+# input and glyphs, so incremental batch runs re-render everything.
+GENERATOR_VERSION = 2
+
+
+def source_key(path):
+    """Stable key for a glyph source file: relative to the repo root when possible."""
+    try:
+        return Path(path).relative_to(ROOT_DIR).as_posix()
+    except ValueError:
+        return str(path)
 
 
 def get_available_compounds():
@@ -110,135 +158,10 @@ def read_svg_paths_by_label(svg_file, labels):
 
 
 def _path_bbox(d):
-    """Approximate bbox for an SVG path (handles common commands safely)."""
+    """Exact bbox for an SVG path (curve extrema and arcs), or None if it is empty."""
     if not d:
         return None
-    tokens = re.findall(r'[a-zA-Z]|[-+]?(?:\d*\.\d+|\d+)(?:[eE][-+]?\d+)?', d)
-    if not tokens:
-        return None
-
-    idx = 0
-    cmd = None
-    x = y = 0.0
-    start_x = start_y = 0.0
-    last_cx = last_cy = None
-    min_x = min_y = float('inf')
-    max_x = max_y = float('-inf')
-
-    def update(px, py):
-        nonlocal min_x, min_y, max_x, max_y
-        min_x = min(min_x, px)
-        min_y = min(min_y, py)
-        max_x = max(max_x, px)
-        max_y = max(max_y, py)
-
-    def read_numbers(n):
-        nonlocal idx
-        if idx + n > len(tokens):
-            return None
-        vals = tokens[idx:idx + n]
-        if any(re.match(r'[a-zA-Z]', v) for v in vals):
-            return None
-        idx += n
-        return [float(v) for v in vals]
-
-    while idx < len(tokens):
-        if re.match(r'[a-zA-Z]', tokens[idx]):
-            cmd = tokens[idx]
-            idx += 1
-        if cmd is None:
-            break
-
-        c = cmd
-        if c in ('Z', 'z'):
-            x, y = start_x, start_y
-            update(x, y)
-            cmd = None
-            continue
-
-        if c in ('M', 'm', 'L', 'l', 'T', 't'):
-            vals = read_numbers(2)
-            if not vals:
-                break
-            dx, dy = vals
-            if c.islower():
-                x += dx
-                y += dy
-            else:
-                x = dx
-                y = dy
-            if c in ('M', 'm'):
-                start_x, start_y = x, y
-                cmd = 'l' if c == 'm' else 'L'
-            update(x, y)
-        elif c in ('H', 'h'):
-            vals = read_numbers(1)
-            if not vals:
-                break
-            dx = vals[0]
-            x = x + dx if c == 'h' else dx
-            update(x, y)
-        elif c in ('V', 'v'):
-            vals = read_numbers(1)
-            if not vals:
-                break
-            dy = vals[0]
-            y = y + dy if c == 'v' else dy
-            update(x, y)
-        elif c in ('C', 'c'):
-            vals = read_numbers(6)
-            if not vals:
-                break
-            x1, y1, x2, y2, x3, y3 = vals
-            if c.islower():
-                x1 += x; y1 += y; x2 += x; y2 += y; x3 += x; y3 += y
-            update(x1, y1)
-            update(x2, y2)
-            x, y = x3, y3
-            update(x, y)
-            last_cx, last_cy = x2, y2
-        elif c in ('S', 's'):
-            vals = read_numbers(4)
-            if not vals:
-                break
-            x2, y2, x3, y3 = vals
-            if last_cx is None:
-                x1, y1 = x, y
-            else:
-                x1, y1 = 2 * x - last_cx, 2 * y - last_cy
-            if c.islower():
-                x2 += x; y2 += y; x3 += x; y3 += y
-            update(x1, y1)
-            update(x2, y2)
-            x, y = x3, y3
-            update(x, y)
-            last_cx, last_cy = x2, y2
-        elif c in ('Q', 'q'):
-            vals = read_numbers(4)
-            if not vals:
-                break
-            x1, y1, x2, y2 = vals
-            if c.islower():
-                x1 += x; y1 += y; x2 += x; y2 += y
-            update(x1, y1)
-            x, y = x2, y2
-            update(x, y)
-            last_cx, last_cy = x1, y1
-        elif c in ('A', 'a'):
-            vals = read_numbers(7)
-            if not vals:
-                break
-            x2, y2 = vals[5], vals[6]
-            if c.islower():
-                x2 += x; y2 += y
-            x, y = x2, y2
-            update(x, y)
-        else:
-            cmd = None
-
-    if min_x == float('inf'):
-        return None
-    return min_x, min_y, max_x, max_y
+    return compile_path(d).bbox()
 
 
 def _paths_bbox(paths):
@@ -259,34 +182,302 @@ def _paths_bbox(paths):
     return tuple(bbox)
 
 
+class GlyphAssets:
+    """Process-wide registry of parsed glyph assets.
+
+    Word, compound, syllable and cartouche SVGs are parsed once, on first use,
+    and kept in a bounded LRU cache. Each asset is a dict with 'paths',
+    'viewbox' and 'bbox' (the cartouche holds one entry per label instead).
+    Missing glyphs are not cached, so junk words and names in labels cannot
+    evict real glyphs; looking one up again is a dict lookup in the bundle
+    (or a stat without it).
+
+    With a bundle_path, all assets come from the compiled glyph bundle, which
+    is loaded (and rebuilt if stale) on first use. Pass bundle_path=None to
+    parse the individual SVG files instead.
+    """
+
+    def __init__(self, max_entries=ASSET_CACHE_SIZE, bundle_path=BUNDLE_PATH):
+        self.max_entries = max_entries
+        self.bundle_path = bundle_path
+        self._bundle = None
+        self._cache = OrderedDict()
+        self._compounds = None
+        self._compound_index = None
+        self._digests = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key, loader):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        asset = loader()
+        if asset is None:
+            return None
+        self._cache[key] = asset
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+        return asset
+
+    def bundle(self):
+        """The compiled glyph bundle, or None when reading SVGs directly."""
+        if self._bundle is None and self.bundle_path is not None:
+            from build_glyph_bundle import load_bundle
+            try:
+                self._bundle = load_bundle(self.bundle_path)
+            except OSError as exc:
+                print(f'Warning: glyph bundle unavailable ({exc}), reading SVGs',
+                      file=sys.stderr)
+                self.bundle_path = None
+        return self._bundle
+
+    def compounds(self):
+        """Set of compound names available in sitelen_seli_kiwen_svgs/."""
+        if self._compounds is None:
+            bundle = self.bundle()
+            if bundle is not None:
+                self._compounds = set(bundle['compounds'])
+            else:
+                self._compounds = get_available_compounds()
+        return self._compounds
+
+    def compound_index(self):
+        """CompoundIndex over compounds(), built once."""
+        if self._compound_index is None:
+            self._compound_index = CompoundIndex(self.compounds())
+        return self._compound_index
+
+    def word(self, word):
+        """Word or compound glyph asset, or None if there is no SVG for it."""
+        kind = 'compound' if '-' in word else 'word'
+
+        def load():
+            bundle = self.bundle()
+            if bundle is not None:
+                return bundle['words'].get(word)
+            return _load_asset(WORD_SVGS_DIR / f'Sitelen seli kiwen - {word}.svg')
+
+        return self._get((kind, word), load)
+
+    def syllable(self, syllable):
+        """Syllable glyph asset, or None if there is no SVG for it."""
+        svg_name = syllable_to_svg_name(syllable)
+
+        def load():
+            bundle = self.bundle()
+            if bundle is not None:
+                return bundle['syllables'].get(svg_name)
+            return _load_asset(SYLLABLES_DIR / f'sitelen kalama pona - {svg_name}.svg')
+
+        return self._get(('syllable', syllable), load)
+
+    def cartouche(self):
+        """Cartouche asset with left/center/right paths and bboxes."""
+
+        def load():
+            bundle = self.bundle()
+            if bundle is not None and bundle['cartouche'] is not None:
+                return bundle['cartouche']
+            return _load_cartouche()
+
+        return self._get(('cartouche', CARTOUCHE_SVG.name), load)
+
+    def source_file(self, asset):
+        """Source SVG for an asset key like 'word:jan', 'syllable:ka' or 'cartouche'."""
+        kind, _, name = asset.partition(':')
+        if kind in ('word', 'compound'):
+            return WORD_SVGS_DIR / f'Sitelen seli kiwen - {name}.svg'
+        if kind == 'syllable':
+            return SYLLABLES_DIR / f'sitelen kalama pona - {syllable_to_svg_name(name)}.svg'
+        if kind == 'cartouche':
+            return CARTOUCHE_SVG
+        raise ValueError(f'Unknown asset kind: {asset}')
+
+    def digest(self, asset):
+        """SHA-256 of an asset's source SVG, or None if the file does not exist."""
+        if asset not in self._digests:
+            path = self.source_file(asset)
+            bundle = self.bundle()
+            entry = bundle['sources'].get(source_key(path)) if bundle is not None else None
+            if entry is not None:
+                self._digests[asset] = entry[2]
+            elif path.exists():
+                self._digests[asset] = hashlib.sha256(path.read_bytes()).hexdigest()
+            else:
+                self._digests[asset] = None
+        return self._digests[asset]
+
+    def stats(self):
+        return {
+            'entries': len(self._cache),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        self._cache.clear()
+        self._bundle = None
+        self._compounds = None
+        self._compound_index = None
+        self._digests.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+def _load_asset(svg_file):
+    paths, vb = read_svg_paths(svg_file)
+    if not paths or not vb:
+        return None
+    return {'paths': paths, 'viewbox': vb, 'bbox': _paths_bbox(paths)}
+
+
+def _load_cartouche():
+    paths_by_label, vb = read_svg_paths_by_label(CARTOUCHE_SVG, CARTOUCHE_LABELS)
+    if not paths_by_label or not vb:
+        raise FileNotFoundError(
+            f'Cartouche SVG not found or invalid: {CARTOUCHE_SVG}'
+        )
+    if any(not paths_by_label[label] for label in CARTOUCHE_LABELS):
+        raise ValueError('Cartouche SVG is missing left/center/right labels.')
+    return {
+        'paths': paths_by_label,
+        'viewbox': vb,
+        'bbox': {label: _paths_bbox(paths_by_label[label]) for label in CARTOUCHE_LABELS},
+    }
+
+
+# Shared by generate() and batch_generate_svgs.py
+ASSETS = GlyphAssets()
+
+# Pipeline stages timed by render() and generate(), in pipeline order
+STAGES = ('parse', 'match', 'load', 'layout', 'elements', 'build', 'write')
+
+
+class StageTimes:
+    """Wall time per pipeline stage (see STAGES), summed over calls.
+
+    render() adds each call's 'timings' to STAGE_TIMES and generate() adds
+    its 'write' time, so a process can report where its rendering time went.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = {}
+
+    def add(self, timings, calls=1):
+        self.calls += calls
+        for stage, seconds in timings.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def merge(self, summary):
+        """Add a summary from take() (e.g. one sent back by a worker process)."""
+        self.add(summary['seconds'], summary['calls'])
+
+    def take(self):
+        """Return {'calls', 'seconds'} since the last call and reset."""
+        summary = {'calls': self.calls, 'seconds': dict(self.seconds)}
+        self.calls = 0
+        self.seconds = {}
+        return summary
+
+    def as_dict(self):
+        total = sum(self.seconds.values())
+        stages = {}
+        for stage in sorted(self.seconds, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            seconds = self.seconds[stage]
+            stages[stage] = {
+                'total_s': round(seconds, 4),
+                'per_call_ms': round(seconds / self.calls * 1000, 4) if self.calls else None,
+                'share': round(seconds / total, 4) if total else None,
+            }
+        return {'calls': self.calls, 'total_s': round(total, 4), 'stages': stages}
+
+    def table(self):
+        summary = self.as_dict()
+        lines = [f'{"stage":<10} {"total s":>9} {"ms/call":>9} {"share":>6}']
+        for stage, row in summary['stages'].items():
+            lines.append(f'{stage:<10} {row["total_s"]:>9.2f} {row["per_call_ms"] or 0:>9.3f} '
+                         f'{row["share"] or 0:>6.1%}')
+        lines.append(f'{"total":<10} {summary["total_s"]:>9.2f} '
+                     f'{summary["total_s"] / self.calls * 1000 if self.calls else 0:>9.3f} '
+                     f'({self.calls} calls)')
+        return '\n'.join(lines)
+
+
+STAGE_TIMES = StageTimes()
+
+
+def _lap(timings, stage, start):
+    """Add the time since start to timings[stage] and return the current time."""
+    now = time.perf_counter()
+    timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+
 def parse_syllables(name):
     """Parse a proper name into toki pona syllables.
     e.g., 'Amatelasu' -> ['a', 'ma', 'te', 'la', 'su']
     """
-    name = name.lower()
+    return SYLLABLE_RE.findall(name.lower())
+
+
+def syllabify(name):
+    """parse_syllables() plus the spans of the name that are not toki pona.
+
+    Returns (syllables, problems). Each problem is a dict with the 'start'
+    and 'end' offsets in name, the 'text' of name there and a 'reason'
+    (offsets are mapped back when lowercasing changes the length, as for
+    'İ'): 'skipped' for
+    characters that are not toki pona letters (left out of the syllables),
+    'no vowel' for a consonant without a vowel, 'forbidden' for ji, ti, wo
+    and wu, and 'nasal' for a final n before n or m (these three are kept,
+    as parse_syllables() does).
+    """
+    lowered = name.lower()
+    origin = None  # offset in lowered -> offset in name, when they differ
+    if len(lowered) != len(name):
+        origin = [i for i, char in enumerate(name) for _ in char.lower()]
     syllables = []
-    i = 0
-    while i < len(name):
-        if name[i] in CONSONANTS:
-            syl = name[i]
-            i += 1
-            if i < len(name) and name[i] in 'aeiou':
-                syl += name[i]
-                i += 1
-                if i < len(name) and name[i] == 'n' and (i + 1 >= len(name) or name[i + 1] not in 'aeiou'):
-                    syl += 'n'
-                    i += 1
-            syllables.append(syl)
-        elif name[i] in 'aeiou':
-            syl = name[i]
-            i += 1
-            if i < len(name) and name[i] == 'n' and (i + 1 >= len(name) or name[i + 1] not in 'aeiou'):
-                syl += 'n'
-                i += 1
-            syllables.append(syl)
+    problems = []
+    for match in _SYLLABLE_SCAN_RE.finditer(lowered):
+        syllable, consonant, skipped = match.groups()
+        start, end = match.span()
+        if skipped:
+            reason = 'skipped'
+        elif consonant:
+            syllables.append(consonant)
+            reason = 'no vowel'
         else:
-            i += 1
-    return syllables
+            syllables.append(syllable)
+            if syllable[:2] in FORBIDDEN_SYLLABLES:
+                reason = 'forbidden'
+            elif syllable[-1] == 'n' and len(syllable) > 1 and lowered[end:end + 1] in ('n', 'm'):
+                reason = 'nasal'
+            else:
+                continue
+        if origin is not None:
+            start, end = origin[start], origin[end - 1] + 1
+        problems.append({'start': start, 'end': end, 'text': name[start:end], 'reason': reason})
+    return syllables, problems
+
+
+def parse_many(names):
+    """syllabify() over an iterable of names, lazily.
+
+    Repeated names (common in label corpora) are parsed once.
+    """
+    memo = {}
+    for name in names:
+        result = memo.get(name)
+        if result is None:
+            result = memo[name] = syllabify(name)
+        yield list(result[0]), list(result[1])
 
 
 def syllable_to_svg_name(syllable):
@@ -315,23 +506,79 @@ def parse_input(text):
     return words, sound_name
 
 
-def match_compounds(word_tokens, compound_set):
-    """Greedily match word tokens into compounds where possible."""
-    result = []
-    i = 0
-    while i < len(word_tokens):
-        matched = False
-        for length in range(min(4, len(word_tokens) - i), 1, -1):
-            candidate = '-'.join(word_tokens[i:i + length])
-            if candidate in compound_set:
-                result.append(candidate)
-                i += length
-                matched = True
-                break
-        if not matched:
-            result.append(word_tokens[i])
-            i += 1
-    return result
+class CompoundIndex:
+    """Prefix trie of compound names, keyed word by word.
+
+    'jan-sewi' is stored as root['jan']['sewi'][None] = 'jan-sewi', so
+    match() finds the longest compound at each position in one left-to-right
+    walk, without joining candidate strings, for compounds of any length.
+    """
+
+    def __init__(self, compounds=()):
+        self._root = {}
+        self.size = 0
+        self.longest = 0
+        for compound in compounds:
+            self.add(compound)
+
+    def add(self, compound):
+        words = compound.split('-')
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        if None not in node:
+            node[None] = compound
+            self.size += 1
+            self.longest = max(self.longest, len(words))
+
+    def __len__(self):
+        return self.size
+
+    def match(self, word_tokens):
+        """Greedily replace runs of word tokens with the longest compounds."""
+        root = self._root
+        n = len(word_tokens)
+        result = []
+        i = 0
+        while i < n:
+            matched, end = word_tokens[i], i + 1
+            node = root
+            j = i
+            while j < n:
+                node = node.get(word_tokens[j])
+                if node is None:
+                    break
+                j += 1
+                compound = node.get(None)
+                if compound is not None:
+                    matched, end = compound, j
+            result.append(matched)
+            i = end
+        return result
+
+    def match_many(self, token_lists):
+        """match() over an iterable of token lists, lazily.
+
+        Repeated token lists (common in label corpora) are matched once.
+        """
+        memo = {}
+        for word_tokens in token_lists:
+            key = tuple(word_tokens)
+            matched = memo.get(key)
+            if matched is None:
+                matched = memo[key] = self.match(word_tokens)
+            yield list(matched)
+
+
+def match_compounds(word_tokens, compounds):
+    """Greedily match word tokens into the longest available compounds.
+
+    compounds is a CompoundIndex (see GlyphAssets.compound_index) or a
+    collection of compound names, which is indexed on every call.
+    """
+    if not isinstance(compounds, CompoundIndex):
+        compounds = CompoundIndex(compounds)
+    return compounds.match(word_tokens)
 
 
 def word_commons_url(word):
@@ -366,42 +613,254 @@ def safe_filename(name):
     return name
 
 
-def generate(text):
-    """Generate a composed SVG for the given toki pona phrase."""
-    print(f'Input: {text}')
+def word_asset_key(word):
+    return f'compound:{word}' if '-' in word else f'word:{word}'
+
+
+def output_filename(text, word_tokens, sound_name):
+    """Name of the SVG written for a phrase, e.g. 'sitelen ilo pona - jan, ali.svg'."""
+    if word_tokens and sound_name:
+        filename_text = f'{" ".join(word_tokens)}, {sound_name.lower()}'
+    elif sound_name:
+        filename_text = f', {sound_name.lower()}'
+    else:
+        filename_text = text
+    return f'sitelen ilo pona - {safe_filename(filename_text)}.svg'
+
+
+def output_relpath(filename, layout='flat'):
+    """Path of an output file relative to output/ for an output layout.
+
+    'flat' keeps every file directly in output/; 'hash:N' puts it in a
+    subdirectory named by the first N hex digits of the SHA-1 of its name.
+    """
+    if layout == 'flat':
+        return filename
+    width = int(layout.partition(':')[2] or 2)
+    return f'{hashlib.sha1(filename.encode("utf-8")).hexdigest()[:width]}/{filename}'
 
+
+def asset_keys(matched_words, syllables):
+    """Distinct asset keys (see GlyphAssets.source_file) used by a rendering."""
+    keys = [word_asset_key(word) for word in matched_words]
+    keys += [f'syllable:{syl}' for syl in syllables]
+    if syllables:
+        keys.append('cartouche')
+    return list(dict.fromkeys(keys))
+
+
+def plan(text, assets=None):
+    """Resolve a phrase without rendering it.
+
+    Returns the parsed words, matched compounds, syllables, the problems
+    syllabify() found in the name, the output filename and the asset keys
+    (see GlyphAssets.source_file) it depends on.
+    """
+    if assets is None:
+        assets = ASSETS
     word_tokens, sound_name = parse_input(text)
-    print(f'  Words: {word_tokens}')
-    print(f'  Sound name: {sound_name}')
+    matched_words = assets.compound_index().match(word_tokens)
+    syllables, problems = syllabify(sound_name) if sound_name else ([], [])
+    return _plan(text, word_tokens, sound_name, matched_words, syllables, problems)
+
+
+def plan_many(texts, assets=None):
+    """plan() for each of an iterable of phrases, lazily.
+
+    Compounds are matched with CompoundIndex.match_many() and names parsed
+    with parse_many(), so repeated words and names are handled once.
+    """
+    if assets is None:
+        assets = ASSETS
+    parsed, tokens, names = tee(((text, *parse_input(text)) for text in texts), 3)
+    matches = assets.compound_index().match_many(word_tokens for _, word_tokens, _ in tokens)
+    parses = parse_many(sound_name or '' for _, _, sound_name in names)
+    for (text, word_tokens, sound_name), matched_words, (syllables, problems) in zip(
+            parsed, matches, parses):
+        yield _plan(text, word_tokens, sound_name, matched_words, syllables, problems)
+
+
+def _plan(text, word_tokens, sound_name, matched_words, syllables, problems):
+    return {
+        'words': word_tokens,
+        'sound_name': sound_name,
+        'matched_words': matched_words,
+        'syllables': syllables,
+        'name_problems': problems,
+        'output_name': output_filename(text, word_tokens, sound_name),
+        'assets': asset_keys(matched_words, syllables),
+    }
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def strip_flip_transform(transform):
+    if not transform:
+        return ''
+    return re.sub(r'scale\(\s*1\s*,\s*-1\s*\)', '', transform).strip()
+
+
+def _placement(piece, sx, sy, flip_aware):
+    """Where a glyph piece goes: translate(tx,ty) scale(sx,sy) of its own coordinates."""
+    vb_x, vb_y = piece['viewbox'][:2]
+    return {
+        'glyph': piece['glyph'],
+        'paths': piece['paths'],
+        'tx': piece['x_offset'] - vb_x * sx,
+        'ty': piece['y_offset'] - vb_y * sy,
+        'sx': sx,
+        'sy': sy,
+        'flip_aware': flip_aware,
+    }
 
-    # Find available compounds from extracted SVGs
-    compound_set = get_available_compounds()
-    print(f'  Available compounds: {len(compound_set)}')
 
-    # Match compounds greedily
-    matched_words = match_compounds(word_tokens, compound_set)
-    print(f'  Matched words: {matched_words}')
+def _inline_elements(placement):
+    """One <path> (or <g><path>) element per path, each carrying the full transform."""
+    tx, ty = placement['tx'], placement['ty']
+    sx, sy = placement['sx'], placement['sy']
+    elements = []
+    for path in placement['paths']:
+        transform = (path.get('transform') or '').strip()
+        has_flip = placement['flip_aware'] and 'scale(1,-1)' in transform.replace(' ', '')
+
+        if has_flip:
+            # Word SVGs from font: viewBox like "0 -1000 900 1200", path has scale(1,-1)
+            # The path is in font coordinates (Y-up). scale(1,-1) flips it.
+            # viewBox origin is (0, -ascent). We need to map this into our output space.
+            transform = strip_flip_transform(transform)
+            outer = f'translate({tx:.2f},{ty:.2f}) scale({sx:.4f},{-sy:.4f})'
+        else:
+            # Syllable SVGs: viewBox like "0 0 1000 1000", no flip
+            outer = f'translate({tx:.2f},{ty:.2f}) scale({sx:.4f},{sy:.4f})'
+
+        if transform:
+            elements.append(
+                f'  <g transform="{outer}">'
+                f'<path d="{path["d"]}" transform="{transform}" fill="#000000" />'
+                f'</g>'
+            )
+        else:
+            elements.append(
+                f'  <path d="{path["d"]}"'
+                f' transform="{outer}"'
+                f' fill="#000000" />'
+            )
+    return elements
+
+
+def _baked_elements(placement, precision):
+    """Transform-free <path> elements with the placement applied to their coordinates."""
+    outer = (placement['sx'], 0.0, 0.0, placement['sy'], placement['tx'], placement['ty'])
+    elements = []
+    for path in placement['paths']:
+        m = multiply(outer, parse_transform(path.get('transform') or ''))
+        d = compile_path(path['d']).transform(m).serialize(precision)
+        elements.append(f'  <path d="{d}" fill="#000000" />')
+    return elements
+
+
+def _symbol_elements(placements):
+    """<defs> with one <symbol> per distinct glyph, followed by a <use> per placement."""
+    symbol_ids = {}
+    defs = []
+    uses = []
+    for placement in placements:
+        glyph = placement['glyph']
+        if glyph not in symbol_ids:
+            symbol_ids[glyph] = f'g{len(symbol_ids)}'
+            body = ''.join(
+                f'<path d="{path["d"]}" transform="{path["transform"].strip()}" fill="#000000" />'
+                if (path.get('transform') or '').strip() else
+                f'<path d="{path["d"]}" fill="#000000" />'
+                for path in placement['paths']
+            )
+            # Glyph coordinates can be negative (font glyphs sit above the
+            # baseline), so the symbol viewport must not clip.
+            defs.append(f'    <symbol id="{symbol_ids[glyph]}" overflow="visible">{body}</symbol>')
+        uses.append(
+            f'  <use xlink:href="#{symbol_ids[glyph]}"'
+            f' transform="translate({placement["tx"]:.2f},{placement["ty"]:.2f})'
+            f' scale({placement["sx"]:.4f},{placement["sy"]:.4f})" />'
+        )
+    if not defs:
+        return []
+    return ['  <defs>'] + defs + ['  </defs>'] + uses
+
+
+# Decimals kept in baked path data; more is far below what a renderer resolves
+MAX_PRECISION = 6
+
+
+def parse_precision(text):
+    """argparse type for --precision: an integer in 0..MAX_PRECISION."""
+    try:
+        precision = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected an integer, got "{text}"')
+    if not 0 <= precision <= MAX_PRECISION:
+        raise argparse.ArgumentTypeError(f'precision must be 0 to {MAX_PRECISION}, got {precision}')
+    return precision
+
+
+def render(text, assets=None, symbols=False, bake=False, precision=2):
+    """Render a composed SVG for the given toki pona phrase, in memory.
+
+    Nothing is printed or written. Returns a dict with the SVG ('svg', UTF-8
+    bytes), the Commons description sidecar ('sidecar'), the output
+    'filename', layout metadata ('width', 'height', 'sources',
+    'categories'), the parse ('words', 'sound_name', 'matched_words',
+    'syllables'), the asset keys used, any glyphs that were missing, and the
+    wall time spent in each pipeline stage ('timings', seconds; see STAGES).
+
+    With symbols=True each distinct glyph is written once as a <symbol> in
+    <defs> and placed with <use>, which keeps long names much smaller.
+    With bake=True each glyph's transform is applied to its path coordinates,
+    written as compact relative path data with `precision` decimals
+    (0..MAX_PRECISION).
+    """
+    if assets is None:
+        assets = ASSETS
+    if symbols and bake:
+        raise ValueError('symbols and bake output modes cannot be combined')
+    if not 0 <= precision <= MAX_PRECISION:
+        raise ValueError(f'precision must be 0 to {MAX_PRECISION}, got {precision}')
+
+    timings = {}
+    t = time.perf_counter()
+    word_tokens, sound_name = parse_input(text)
+    t = _lap(timings, 'parse', t)
+
+    # Match compounds greedily against the extracted SVGs
+    compounds = assets.compound_index()
+    t = _lap(timings, 'load', t)
+    matched_words = compounds.match(word_tokens)
+    t = _lap(timings, 'match', t)
 
-    # Parse syllables
     syllables = parse_syllables(sound_name) if sound_name else []
-    print(f'  Syllables: {syllables}')
+    t = _lap(timings, 'parse', t)
 
     word_pieces = []
     syllable_pieces = []
     cartouche_pieces = []
     sources = []
+    missing_words = []
+    missing_syllables = []
     x_cursor = 0
 
     # Read word SVGs
     for word in matched_words:
-        svg_file = WORD_SVGS_DIR / f'Sitelen seli kiwen - {word}.svg'
-        paths, vb = read_svg_paths(svg_file)
+        asset = assets.word(word)
+        t = _lap(timings, 'load', t)
 
-        if paths and vb:
+        if asset:
+            paths, vb = asset['paths'], asset['viewbox']
             vb_x, vb_y, vb_w, vb_h = vb
             scale = (TARGET_HEIGHT / vb_h if vb_h > 0 else 1) * 1.15
             word_pieces.append({
                 'type': 'word',
+                'glyph': word_asset_key(word),
                 'paths': paths,
                 'viewbox': vb,
                 'scale': scale,
@@ -410,18 +869,18 @@ def generate(text):
             })
             x_cursor += vb_w * scale + SPACING
             sources.append(f'{word}: {word_commons_url(word)}')
-            print(f'  Loaded word SVG: {word}')
         else:
-            print(f'  Warning: could not load SVG for "{word}"')
+            missing_words.append(word)
+        t = _lap(timings, 'layout', t)
 
     # Read syllable SVGs and compute cartouche layout
     syllable_items = []
     for syl in syllables:
-        svg_name = syllable_to_svg_name(syl)
-        svg_file = SYLLABLES_DIR / f'sitelen kalama pona - {svg_name}.svg'
-        paths, vb = read_svg_paths(svg_file)
+        asset = assets.syllable(syl)
+        t = _lap(timings, 'load', t)
 
-        if paths and vb:
+        if asset:
+            paths, vb = asset['paths'], asset['viewbox']
             vb_x, vb_y, vb_w, vb_h = vb
             scale = (TARGET_HEIGHT / vb_h if vb_h > 0 else 1) * 0.8
             syllable_items.append({
@@ -431,27 +890,19 @@ def generate(text):
                 'scale': scale,
             })
             sources.append(f'{syl}: {syllable_commons_url(syl)}')
-            print(f'  Loaded syllable: {syl}')
         else:
-            print(f'  Warning: could not load syllable "{syl}"')
+            missing_syllables.append(syl)
+        t = _lap(timings, 'layout', t)
 
     if syllable_items:
-        cartouche_labels = {'left', 'center', 'right'}
-        cartouche_paths_by_label, cartouche_vb = read_svg_paths_by_label(
-            CARTOUCHE_SVG,
-            cartouche_labels,
-        )
-        if not cartouche_paths_by_label or not cartouche_vb:
-            raise FileNotFoundError(
-                f'Cartouche SVG not found or invalid: {CARTOUCHE_SVG}'
-            )
-
-        if any(not cartouche_paths_by_label[label] for label in cartouche_labels):
-            raise ValueError('Cartouche SVG is missing left/center/right labels.')
+        cartouche = assets.cartouche()
+        t = _lap(timings, 'load', t)
+        cartouche_paths_by_label = cartouche['paths']
+        cartouche_vb = cartouche['viewbox']
 
         c_vb_x, c_vb_y, c_vb_w, c_vb_h = cartouche_vb
         cartouche_scale = TARGET_HEIGHT / c_vb_h if c_vb_h > 0 else 1
-        center_bbox = _paths_bbox(cartouche_paths_by_label['center'])
+        center_bbox = cartouche['bbox']['center']
         if not center_bbox:
             raise ValueError('Failed to compute cartouche center bounds.')
         cartouche_bar_height = (center_bbox[3] - center_bbox[1]) * cartouche_scale
@@ -469,8 +920,8 @@ def generate(text):
         if len(syllable_widths) > 1:
             syllable_total_width += SPACING * (len(syllable_widths) - 1)
 
-        left_bbox = _paths_bbox(cartouche_paths_by_label['left'])
-        right_bbox = _paths_bbox(cartouche_paths_by_label['right'])
+        left_bbox = cartouche['bbox']['left']
+        right_bbox = cartouche['bbox']['right']
         if not left_bbox or not right_bbox:
             raise ValueError('Failed to compute cartouche side bounds.')
 
@@ -488,6 +939,7 @@ def generate(text):
 
         # Left/right keep native proportions (scale_x == scale_y)
         cartouche_pieces.append({
+            'glyph': 'cartouche:left',
             'paths': cartouche_paths_by_label['left'],
             'viewbox': cartouche_vb,
             'scale_x': cartouche_scale,
@@ -501,6 +953,7 @@ def generate(text):
             seg_x = middle_x + i * seg_w
             center_x = seg_x + (seg_w - center_w) / 2
             cartouche_pieces.append({
+                'glyph': 'cartouche:center',
                 'paths': cartouche_paths_by_label['center'],
                 'viewbox': cartouche_vb,
                 'scale_x': cartouche_scale,
@@ -510,6 +963,7 @@ def generate(text):
             })
 
         cartouche_pieces.append({
+            'glyph': 'cartouche:right',
             'paths': cartouche_paths_by_label['right'],
             'viewbox': cartouche_vb,
             'scale_x': cartouche_scale,
@@ -526,6 +980,7 @@ def generate(text):
             y_offset = (TARGET_HEIGHT - vb_h * item['scale']) / 2
             syllable_pieces.append({
                 'type': 'syllable',
+                'glyph': f'syllable:{item["syllable"]}',
                 'paths': item['paths'],
                 'viewbox': item['viewbox'],
                 'scale': item['scale'],
@@ -539,6 +994,7 @@ def generate(text):
     # Build SVG
     has_content = bool(word_pieces or syllable_pieces or cartouche_pieces)
     total_width = x_cursor - SPACING if has_content else 0
+    t = _lap(timings, 'layout', t)
 
     # Categories for Commons uploads
     word_phrase = ' '.join(word_tokens)
@@ -574,134 +1030,186 @@ def generate(text):
         f'<!--\n{comment}\n-->',
         f'<svg version="1.1" width="{total_width:.0f}" height="{TARGET_HEIGHT}"',
         f'     viewBox="0 0 {total_width:.0f} {TARGET_HEIGHT}"',
-        '     xmlns="http://www.w3.org/2000/svg">',
+        '     xmlns="http://www.w3.org/2000/svg"'
+        + (' xmlns:xlink="http://www.w3.org/1999/xlink">' if symbols else '>'),
     ]
-
-    def strip_flip_transform(transform):
-        if not transform:
-            return ''
-        return re.sub(r'scale\(\s*1\s*,\s*-1\s*\)', '', transform).strip()
-
-    # Render word glyphs
-    for piece in word_pieces:
-        vb_x, vb_y, vb_w, vb_h = piece['viewbox']
-        s = piece['scale']
-        tx = piece['x_offset'] - vb_x * s
-        ty = -vb_y * s + piece['y_offset']
-
-        for path in piece['paths']:
-            transform = path.get('transform', '')
-            has_flip = 'scale(1,-1)' in transform.replace(' ', '')
-            inner_transform = strip_flip_transform(transform) if has_flip else transform
-            inner_transform = inner_transform.strip()
-
-            if has_flip:
-                # Word SVGs from font: viewBox like "0 -1000 900 1200", path has scale(1,-1)
-                # The path is in font coordinates (Y-up). scale(1,-1) flips it.
-                # viewBox origin is (0, -ascent). We need to map this into our output space.
-                outer = f'translate({tx:.2f},{ty:.2f}) scale({s:.4f},{-s:.4f})'
-            else:
-                # Syllable SVGs: viewBox like "0 0 1000 1000", no flip
-                outer = f'translate({tx:.2f},{ty:.2f}) scale({s:.4f},{s:.4f})'
-
-            if inner_transform:
-                svg_parts.append(
-                    f'  <g transform="{outer}">'
-                    f'<path d="{path["d"]}" transform="{inner_transform}" fill="#000000" />'
-                    f'</g>'
-                )
-            else:
-                svg_parts.append(
-                    f'  <path d="{path["d"]}"'
-                    f' transform="{outer}"'
-                    f' fill="#000000" />'
-                )
-
-    # Render cartouche pieces behind syllables
-    for piece in cartouche_pieces:
-        vb_x, vb_y, vb_w, vb_h = piece['viewbox']
-        sx = piece['scale_x']
-        sy = piece['scale_y']
-        tx = piece['x_offset'] - vb_x * sx
-        ty = piece['y_offset'] - vb_y * sy
-
-        for path in piece['paths']:
-            inner_transform = (path.get('transform') or '').strip()
-            if inner_transform:
-                svg_parts.append(
-                    f'  <g transform="translate({tx:.2f},{ty:.2f}) scale({sx:.4f},{sy:.4f})">'
-                    f'<path d="{path["d"]}" transform="{inner_transform}" fill="#000000" />'
-                    f'</g>'
-                )
-            else:
-                svg_parts.append(
-                    f'  <path d="{path["d"]}"'
-                    f' transform="translate({tx:.2f},{ty:.2f}) scale({sx:.4f},{sy:.4f})"'
-                    f' fill="#000000" />'
-                )
-
-    # Render syllable glyphs
-    for piece in syllable_pieces:
-        vb_x, vb_y, vb_w, vb_h = piece['viewbox']
-        s = piece['scale']
-        tx = piece['x_offset'] - vb_x * s
-        ty = -vb_y * s + piece['y_offset']
-
-        for path in piece['paths']:
-            transform = path.get('transform', '')
-            has_flip = 'scale(1,-1)' in transform.replace(' ', '')
-            inner_transform = strip_flip_transform(transform) if has_flip else transform
-            inner_transform = inner_transform.strip()
-
-            if has_flip:
-                outer = f'translate({tx:.2f},{ty:.2f}) scale({s:.4f},{-s:.4f})'
-            else:
-                outer = f'translate({tx:.2f},{ty:.2f}) scale({s:.4f},{s:.4f})'
-
-            if inner_transform:
-                svg_parts.append(
-                    f'  <g transform="{outer}">'
-                    f'<path d="{path["d"]}" transform="{inner_transform}" fill="#000000" />'
-                    f'</g>'
-                )
-            else:
-                svg_parts.append(
-                    f'  <path d="{path["d"]}"'
-                    f' transform="{outer}"'
-                    f' fill="#000000" />'
-                )
+    t = _lap(timings, 'build', t)
+
+    # Paint order: words, then the cartouche behind the syllables
+    placements = [_placement(piece, piece['scale'], piece['scale'], True) for piece in word_pieces]
+    placements += [_placement(piece, piece['scale_x'], piece['scale_y'], False)
+                   for piece in cartouche_pieces]
+    placements += [_placement(piece, piece['scale'], piece['scale'], True)
+                   for piece in syllable_pieces]
+    t = _lap(timings, 'layout', t)
+
+    if symbols:
+        svg_parts.extend(_symbol_elements(placements))
+    elif bake:
+        for placement in placements:
+            svg_parts.extend(_baked_elements(placement, precision))
+    else:
+        for placement in placements:
+            svg_parts.extend(_inline_elements(placement))
+    t = _lap(timings, 'elements', t)
 
     svg_parts.append('</svg>')
     svg_content = '\n'.join(svg_parts) + '\n'
-
-    output_dir = ROOT_DIR / 'output'
-    output_dir.mkdir(exist_ok=True)
-    if word_tokens and sound_name:
-        filename_text = f'{" ".join(word_tokens)}, {sound_name.lower()}'
-    elif sound_name:
-        filename_text = f', {sound_name.lower()}'
-    else:
-        filename_text = text
-    output_name = f'sitelen ilo pona - {safe_filename(filename_text)}.svg'
-    output_path = output_dir / output_name
-    with open(str(output_path), 'w', encoding='utf-8') as f:
-        f.write(svg_content)
-
-    # Write a Commons-friendly description + categories sidecar
-    sidecar_name = f'{output_name}.wiki.txt'
-    sidecar_path = output_dir / sidecar_name
     sidecar_lines = description_lines + [''] + categories
-    with open(str(sidecar_path), 'w', encoding='utf-8') as f:
-        f.write('\n'.join(sidecar_lines) + '\n')
+    svg = svg_content.encode('utf-8')
+    sidecar = '\n'.join(sidecar_lines) + '\n'
+    _lap(timings, 'build', t)
+    STAGE_TIMES.add(timings)
+
+    return {
+        'text': text,
+        'filename': output_filename(text, word_tokens, sound_name),
+        'svg': svg,
+        'sidecar': sidecar,
+        'width': total_width,
+        'height': TARGET_HEIGHT,
+        'words': word_tokens,
+        'sound_name': sound_name,
+        'matched_words': matched_words,
+        'syllables': syllables,
+        'sources': sources,
+        'categories': categories,
+        'assets': asset_keys(matched_words, syllables),
+        'missing_words': missing_words,
+        'missing_syllables': missing_syllables,
+        'timings': timings,
+    }
+
+
+def generate(text, assets=None, verbose=True, symbols=False, bake=False, precision=2,
+             layout='flat', writer=None, output_dir=None):
+    """Render a phrase (see render()) and write it and its .wiki.txt sidecar to output/.
 
-    print(f'\n  Output: {output_path}')
+    The files go where output_relpath() puts them for the layout, under
+    output_dir if given. Files are written atomically, or handed to `writer`
+    (an output_writer.OutputWriter) to be written in the background, keyed
+    by the SVG's filename. Returns the path of the SVG.
+    """
+    if assets is None:
+        assets = ASSETS
+    log = print if verbose else _quiet
+    log(f'Input: {text}')
+    result = render(text, assets, symbols=symbols, bake=bake, precision=precision)
+
+    log(f'  Words: {result["words"]}')
+    log(f'  Sound name: {result["sound_name"]}')
+    log(f'  Available compounds: {len(assets.compounds())}')
+    log(f'  Matched words: {result["matched_words"]}')
+    log(f'  Syllables: {result["syllables"]}')
+    for word in result['matched_words']:
+        if word in result['missing_words']:
+            log(f'  Warning: could not load SVG for "{word}"')
+        else:
+            log(f'  Loaded word SVG: {word}')
+    for syl in result['syllables']:
+        if syl in result['missing_syllables']:
+            log(f'  Warning: could not load syllable "{syl}"')
+        else:
+            log(f'  Loaded syllable: {syl}')
+
+    if output_dir is None:
+        output_dir = ROOT_DIR / 'output'
+    relpath = output_relpath(result['filename'], layout)
+    output_path = output_dir / relpath
+    start = time.perf_counter()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Commons-friendly description + categories sidecar
+    sidecar_relpath = f'{relpath}.wiki.txt'
+    sidecar = result['sidecar'].encode('utf-8')
+    writes = [(atomic_write, output_path, result['svg']),
+              (atomic_write, output_dir / sidecar_relpath, sidecar)]
+    for func, *args in writes:
+        if writer:
+            writer.submit(func, *args, key=result['filename'])
+        else:
+            func(*args)
+    # With a writer this is only the hand-off (and any wait for a free slot)
+    STAGE_TIMES.add({'write': time.perf_counter() - start}, calls=0)
+
+    log(f'\n  Output: {output_path}')
     return output_path
 
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print('Usage: python generate_sitelen_kalama_pona.py "jan sewi Amatelasu"')
-        sys.exit(1)
+def _stdin_request(line, defaults):
+    """Request dict for one --stdin line: a JSON object or a plain phrase."""
+    if line.startswith('{'):
+        request = json.loads(line)
+    else:
+        request = {'text': line}
+    return {**defaults, **request}
+
 
-    text = sys.argv[1]
-    generate(text)
+def serve_lines(lines, out, inline=False, symbols=False, bake=False, precision=2, assets=None):
+    """Render one request per input line and write one JSON result line per request.
+
+    Results are flushed as they are written, so a caller can pipe requests
+    in and read each result back before sending the next one.
+    """
+    if assets is None:
+        assets = ASSETS
+    defaults = {'inline': inline, 'symbols': symbols, 'bake': bake, 'precision': precision}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        result = {}
+        try:
+            request = _stdin_request(line, defaults)
+            if 'id' in request:
+                result['id'] = request['id']
+            if not isinstance(request.get('text'), str):
+                raise ValueError('request has no "text"')
+            result['text'] = request['text']
+            options = {'symbols': bool(request['symbols']), 'bake': bool(request['bake']),
+                       'precision': int(request['precision'])}
+            if request['inline']:
+                rendered = render(request['text'], assets, **options)
+                result['filename'] = rendered['filename']
+                result['svg'] = rendered['svg'].decode('utf-8')
+            else:
+                output_path = generate(request['text'], assets, verbose=False, **options)
+                result['filename'] = output_path.name
+                result['output'] = str(output_path)
+        except Exception as exc:
+            result['error'] = f'{type(exc).__name__}: {exc}'
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate a sitelen kalama pona composed SVG.',
+        usage='python generate_sitelen_kalama_pona.py [--symbols | --bake] "jan sewi Amatelasu"\n'
+              '       python generate_sitelen_kalama_pona.py --stdin [--inline] < phrases.txt',
+    )
+    parser.add_argument('text', nargs='?',
+                        help='toki pona phrase; the first capitalised word starts the name')
+    parser.add_argument('--stdin', action='store_true',
+                        help='render one phrase or JSON request per stdin line, '
+                             'writing one JSON result per line')
+    parser.add_argument('--inline', action='store_true',
+                        help='with --stdin, return the SVG in the result instead of writing it')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--symbols', action='store_true',
+                      help='write each distinct glyph once as a <symbol> and place it with <use>')
+    mode.add_argument('--bake', action='store_true',
+                      help='apply transforms to the path coordinates and write compact relative paths')
+    parser.add_argument('--precision', type=parse_precision, default=2,
+                        help=f'decimals kept in baked path data, 0 to {MAX_PRECISION} (default 2)')
+    args = parser.parse_args()
+
+    if args.stdin:
+        stdin = sys.stdin
+        if (stdin.encoding or '').lower() != 'utf-8':
+            stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        serve_lines(stdin, sys.stdout, inline=args.inline,
+                    symbols=args.symbols, bake=args.bake, precision=args.precision)
+    elif args.text:
+        generate(args.text, symbols=args.symbols, bake=args.bake, precision=args.precision)
+    else:
+        parser.error('give a phrase, or --stdin')
@@ -0,0 +1,128 @@
+"""
+Atomic file writes and a bounded background writer for generated outputs.
+
+atomic_write() writes to a temporary file next to the target and renames it
+into place, so readers (and a killed run) never see a partial file.
+OutputWriter runs such writes on a small thread pool so that rendering can
+continue while earlier outputs are being written: submit() blocks once
+max_pending writes are queued, and flush() waits for all of them and returns
+the errors by the key each write was submitted with (such as the output's
+name), so the caller can fail just those outputs.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WRITER_THREADS = 4
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# The mode open() would give a new file; mkstemp() makes them 0600
+FILE_MODE = 0o666 & ~_umask()
+
+
+def atomic_write(path, data):
+    """Write bytes to path through a temporary file and a rename."""
+    # Short temporary names: outputs can be close to the 255-byte name limit
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class OutputWriter:
+    """Bounded thread-pool writer.
+
+    Keeps timing stats: 'writes', 'write_s' (time spent writing, summed
+    over the threads) and 'blocked_s' (time callers waited in submit() and
+    flush() for writes to finish).
+    """
+
+    def __init__(self, threads=WRITER_THREADS, max_pending=None):
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='writer')
+        self._slots = threading.Semaphore(max_pending or 4 * threads)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = {}
+        self.threads = threads
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.writes = 0
+        self.write_s = 0.0
+        self.blocked_s = 0.0
+
+    def _run(self, func, args, key):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as exc:
+            with self._lock:
+                self._errors.setdefault(key, exc)
+        finally:
+            with self._lock:
+                self.writes += 1
+                self.write_s += time.perf_counter() - start
+            self._slots.release()
+
+    def submit(self, func, *args, key=None):
+        """Queue func(*args), waiting while max_pending writes are queued.
+
+        An error it raises is reported by flush() under key.
+        """
+        start = time.perf_counter()
+        self._slots.acquire()
+        self.blocked_s += time.perf_counter() - start
+        future = self._pool.submit(self._run, func, args, key)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def write(self, path, data, key=None):
+        self.submit(atomic_write, path, data, key=key)
+
+    def flush(self):
+        """Wait for every queued write; return {key: first error} of the failed ones."""
+        start = time.perf_counter()
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result()
+        self.blocked_s += time.perf_counter() - start
+        with self._lock:
+            errors, self._errors = self._errors, {}
+        return errors
+
+    def take_stats(self):
+        """Return the stats since the last call and reset them."""
+        with self._lock:
+            stats = {'writes': self.writes, 'write_s': self.write_s,
+                     'blocked_s': self.blocked_s}
+            self._reset_stats()
+        return stats
+
+    def close(self):
+        """Flush, stop the threads and return the errors of the last writes."""
+        errors = self.flush()
+        self._pool.shutdown()
+        return errors
@@ -0,0 +1,274 @@
+"""
+Serve sitelen ilo pona SVGs on demand over HTTP.
+
+A small asyncio server around generate_sitelen_kalama_pona.render(). Glyph
+assets stay loaded for the life of the process, and rendered SVGs are kept in
+a bounded LRU cache keyed by the normalized phrase and output options. Cache
+misses are rendered on a worker thread (one, as the glyph assets are not
+thread-safe), so cached responses are not held up behind a cold render.
+
+Endpoints:
+    GET /render?text=jan sewi Amatelasu[&symbols=1 | &bake=1[&precision=0..6]]
+        The SVG, with ETag and Cache-Control headers (If-None-Match -> 304).
+    GET /stats
+        JSON with request counts, cache hit rate, latency percentiles (ms),
+        glyph asset cache stats and render time per pipeline stage.
+
+Usage:
+    python render_server.py
+    python render_server.py --port 8080 --cache-size 4096
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs, quote, urlsplit
+
+from generate_sitelen_kalama_pona import ASSETS, MAX_PRECISION, STAGE_TIMES, render
+
+RENDER_CACHE_SIZE = 1024
+LATENCY_SAMPLES = 10000
+MAX_AGE = 86400
+
+REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+def normalize_text(text):
+    """Collapse runs of whitespace; rendering is otherwise case- and text-sensitive."""
+    return ' '.join(text.split())
+
+
+def _flag(query, name):
+    return query.get(name, [''])[-1].lower() in ('1', 'true', 'yes')
+
+
+def _precision(query):
+    """The precision parameter (default 2), or None if it is not 0..MAX_PRECISION."""
+    try:
+        precision = int(query.get('precision', ['2'])[-1])
+    except ValueError:
+        return None
+    return precision if 0 <= precision <= MAX_PRECISION else None
+
+
+class RenderCache:
+    """LRU cache of rendered SVGs: (text, options) -> {svg, etag, filename}."""
+
+    def __init__(self, max_entries=RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(text, options):
+        return text, tuple(sorted(options.items()))
+
+    def get(self, text, options):
+        """The cached entry (counted as a hit), or None."""
+        key = self._key(text, options)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def add(self, text, options, result):
+        """Cache a render() result (counted as a miss) and return its entry."""
+        key = self._key(text, options)
+        self.misses += 1
+        entry = {
+            'svg': result['svg'],
+            'etag': f'"{hashlib.sha256(result["svg"]).hexdigest()[:32]}"',
+            'filename': result['filename'],
+        }
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    """Nearest-rank percentiles of the samples, in the same unit."""
+    if not samples:
+        return {f'p{p}': None for p in points}
+    ordered = sorted(samples)
+    return {
+        f'p{p}': ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+        for p in points
+    }
+
+
+class RenderServer:
+    def __init__(self, cache_size=RENDER_CACHE_SIZE, max_age=MAX_AGE):
+        self.cache = RenderCache(cache_size)
+        self.max_age = max_age
+        self.started = time.time()
+        self.renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render')
+        self.requests = 0
+        self.errors = 0
+        # Recent /render latencies in ms, for cache hits and misses
+        self.latency = {'hit': deque(maxlen=LATENCY_SAMPLES),
+                        'miss': deque(maxlen=LATENCY_SAMPLES)}
+
+    async def handle_render(self, query, headers):
+        text = normalize_text(query.get('text', [''])[-1])
+        if not text:
+            return 400, {}, b'Missing ?text=\n', None
+        options = {'symbols': _flag(query, 'symbols'), 'bake': _flag(query, 'bake')}
+        if options['symbols'] and options['bake']:
+            return 400, {}, b'symbols and bake cannot be combined\n', None
+        if options['bake']:
+            options['precision'] = _precision(query)
+            if options['precision'] is None:
+                return 400, {}, f'precision must be 0 to {MAX_PRECISION}\n'.encode('utf-8'), None
+
+        entry = self.cache.get(text, options)
+        hit = entry is not None
+        if not hit:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.renderer, partial(render, text, ASSETS, **options))
+            entry = self.cache.add(text, options, result)
+        response_headers = {
+            'Content-Type': 'image/svg+xml; charset=utf-8',
+            'ETag': entry['etag'],
+            'Cache-Control': f'public, max-age={self.max_age}',
+            'Content-Disposition': f"inline; filename*=UTF-8''{quote(entry['filename'])}",
+        }
+        kind = 'hit' if hit else 'miss'
+        if entry['etag'] in headers.get('if-none-match', ''):
+            return 304, response_headers, b'', kind
+        return 200, response_headers, entry['svg'], kind
+
+    def handle_stats(self):
+        latency = {}
+        for kind, samples in self.latency.items():
+            latency[kind] = {'count': len(samples),
+                             **{k: v and round(v, 3) for k, v in percentiles(samples).items()}}
+        body = {
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'errors': self.errors,
+            'render_cache': self.cache.stats(),
+            'latency_ms': latency,
+            'glyph_assets': ASSETS.stats(),
+            'render_stages': STAGE_TIMES.as_dict(),
+        }
+        return 200, {'Content-Type': 'application/json'}, \
+            (json.dumps(body, indent=1) + '\n').encode('utf-8'), None
+
+    async def dispatch(self, method, target, headers):
+        """Returns (status, headers, body, latency kind or None)."""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b'Method not allowed\n', None
+        url = urlsplit(target)
+        if url.path == '/render':
+            return await self.handle_render(parse_qs(url.query), headers)
+        if url.path == '/stats':
+            return self.handle_stats()
+        return 404, {}, b'Not found\n', None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                try:
+                    status, response_headers, body, kind = \
+                        await self.dispatch(method, target, headers)
+                except Exception as exc:
+                    self.errors += 1
+                    status, response_headers, body, kind = \
+                        500, {}, f'{type(exc).__name__}: {exc}\n'.encode('utf-8'), None
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                response_headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+                response_headers['Content-Length'] = str(len(body))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head = f'HTTP/1.1 {status} {REASONS[status]}\r\n' + ''.join(
+                    f'{name}: {value}\r\n' for name, value in response_headers.items())
+                writer.write(head.encode('latin-1') + b'\r\n')
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+
+                if kind:
+                    self.latency[kind].append((time.perf_counter() - start) * 1000)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, cache_size, max_age):
+    server = RenderServer(cache_size, max_age)
+    # Load the glyph bundle and compound index before the first request
+    ASSETS.compound_index()
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    print(f'Serving on http://{host}:{port}/render?text=... (stats at /stats)')
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=RENDER_CACHE_SIZE,
+                        help=f'rendered SVGs kept in memory (default {RENDER_CACHE_SIZE})')
+    parser.add_argument('--max-age', type=int, default=MAX_AGE,
+                        help=f'Cache-Control max-age in seconds (default {MAX_AGE})')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache_size, args.max_age))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Synthetic label corpora and scale tests for the batch pipeline.
+
+corpus writes a wikidata_tok_labels.csv of made-up but phonotactically valid
+labels: toki pona words from sitelen_seli_kiwen_svgs/ (sometimes a compound
+the font has), then usually a proper name built from the syllables in
+uniform_syllables/, e.g. 'ma tomo Pelija'. Words per label and syllables
+per name follow truncated geometric distributions with the given means.
+Exactly round(rows * duplicate rate) rows repeat an earlier label under a new
+QID, as 'ala' does in the real data; all other labels are distinct.
+
+run writes corpora of the given sizes into a scratch directory and runs
+batch_generate_svgs.py (twice: a full build, then a no-op incremental run),
+generate_gallery.py and generate_quickstatements.py on each with --root. It
+records wall time, peak RSS and output size per stage.
+
+Usage:
+    python scale_test.py corpus --rows 100000 --output /tmp/labels.csv
+    python scale_test.py run --rows 10000 100000 --jobs 0
+    python scale_test.py run --rows 50000 --batch-args "--layout hash"
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generate_sitelen_kalama_pona import (
+    FORBIDDEN_SYLLABLES, SYLLABLES_DIR, WORD_SVGS_DIR, get_available_compounds, parse_syllables,
+)
+
+SCRIPT_DIR = Path(__file__).parent
+ROOT_DIR = SCRIPT_DIR.parent
+RESULTS_PATH = ROOT_DIR / 'build' / 'scale' / 'results.json'
+
+# Syllables toki pona does not allow, and their n-final forms
+EXCLUDED_SYLLABLES = FORBIDDEN_SYLLABLES | {f'{syllable}n' for syllable in FORBIDDEN_SYLLABLES}
+MAX_WORDS = 8
+MAX_SYLLABLES = 10
+# Attempts at a label not generated before, before giving up
+MAX_LABEL_ATTEMPTS = 1000
+QID_BASE = 900000000
+
+# (stage, script, whether it takes the batch arguments, what to measure under the root)
+STAGES = [
+    ('batch', 'batch_generate_svgs.py', True, 'output'),
+    ('batch (no-op)', 'batch_generate_svgs.py', True, 'data/output_manifest.json'),
+    ('gallery', 'generate_gallery.py', False, 'gallery.html'),
+    ('quickstatements', 'generate_quickstatements.py', False, 'data/quickstatements.txt'),
+]
+
+
+def inventory():
+    """(words, compounds as word lists, syllables) available to the renderer."""
+    words = sorted(
+        path.stem[len('Sitelen seli kiwen - '):]
+        for path in WORD_SVGS_DIR.glob('Sitelen seli kiwen - *.svg')
+        if '-' not in path.stem[len('Sitelen seli kiwen - '):]
+    )
+    compounds = sorted(compound.split('-') for compound in get_available_compounds())
+    syllables = []
+    for path in sorted(SYLLABLES_DIR.glob('sitelen kalama pona - *.svg')):
+        name = path.stem[len('sitelen kalama pona - '):]
+        syllable = name[1:] if name.startswith('x') else name
+        if syllable not in EXCLUDED_SYLLABLES:
+            syllables.append(syllable)
+    return words, compounds, syllables
+
+
+def _count(rng, mean, minimum, maximum):
+    """Truncated geometric count >= minimum with (before truncation) the given mean."""
+    p = 1 / max(1.0, mean - minimum + 1)
+    count = minimum
+    while count < maximum and rng.random() > p:
+        count += 1
+    return count
+
+
+def make_name(rng, syllables, onset_syllables, mean_syllables):
+    """A capitalized name that parse_syllables() splits back into its syllables."""
+    count = _count(rng, mean_syllables, 1, MAX_SYLLABLES)
+    parts = [rng.choice(syllables)]
+    while len(parts) < count:
+        syllable = rng.choice(onset_syllables)
+        # No 'nn' or 'nm' across a syllable boundary
+        if parts[-1].endswith('n') and syllable[0] in 'nm':
+            continue
+        parts.append(syllable)
+    name = ''.join(parts)
+    assert parse_syllables(name) == parts, (name, parts)
+    return name.capitalize()
+
+
+def make_label(rng, words, compounds, syllables, onset_syllables, options):
+    word_count = _count(rng, options['words'], 0, MAX_WORDS)
+    tokens = [rng.choice(words) for _ in range(word_count)]
+    if tokens and rng.random() < options['compound_rate']:
+        position = rng.randrange(len(tokens))
+        tokens[position:position + 1] = rng.choice(compounds)
+    if not tokens or rng.random() < options['name_rate']:
+        tokens.append(make_name(rng, syllables, onset_syllables, options['syllables']))
+    return ' '.join(tokens)
+
+
+def write_corpus(path, rows, seed=0, words=1.3, syllables=3.0, compound_rate=0.1,
+                 duplicate_rate=0.05, name_rate=0.7):
+    """Write a synthetic labels CSV with `rows` rows. Returns the number of distinct labels."""
+    rng = random.Random(seed)
+    word_list, compounds, syllable_list = inventory()
+    onset_syllables = [syllable for syllable in syllable_list if syllable[0] not in 'aeiou']
+    options = {'words': words, 'syllables': syllables, 'compound_rate': compound_rate,
+               'name_rate': name_rate}
+    # The first row cannot repeat an earlier label
+    duplicates = set(rng.sample(range(1, rows), min(round(rows * duplicate_rate), max(rows - 1, 0))))
+    labels = []
+    seen = set()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['qid', 'label', 'tok_title'])
+        for i in range(rows):
+            if i in duplicates:
+                label = rng.choice(labels)
+            else:
+                for _ in range(MAX_LABEL_ATTEMPTS):
+                    label = make_label(rng, word_list, compounds, syllable_list,
+                                       onset_syllables, options)
+                    if label not in seen:
+                        break
+                else:
+                    raise ValueError(f'no new label after {MAX_LABEL_ATTEMPTS} attempts; '
+                                     'raise --name-rate or --words')
+                labels.append(label)
+                seen.add(label)
+            tok_title = label if rng.random() < 0.5 else ''
+            writer.writerow([f'Q{QID_BASE + i}', label, tok_title])
+    return len(labels)
+
+
+def disk_usage(path):
+    """(files, bytes) under path, or of the file itself."""
+    if path.is_file():
+        return 1, path.stat().st_size
+    files = size = 0
+    for directory, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(directory, name))
+    return files, size
+
+
+def run_stage(script, args, log):
+    """Run a pipeline script; returns (exit code, wall seconds, peak RSS in MB or None)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, str(SCRIPT_DIR / script), *args],
+                            stdout=log, stderr=subprocess.STDOUT)
+    if not hasattr(os, 'wait4'):
+        return proc.wait(), time.perf_counter() - start, None
+    # wait4 reports the child's peak RSS, including the worker processes it
+    # joined. Linux carries this process's own peak over into the child, which
+    # is why the glyph bundle is not loaded here.
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = usage.ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+    return proc.returncode, time.perf_counter() - start, peak
+
+
+def scale_run(rows, workdir, jobs, batch_args, corpus_options):
+    root = workdir / f'{rows}-rows'
+    if root.exists():
+        shutil.rmtree(root)
+    start = time.perf_counter()
+    distinct = write_corpus(root / 'data' / 'wikidata_tok_labels.csv', rows, **corpus_options)
+    result = {'rows': rows, 'distinct_labels': distinct,
+              'corpus_s': round(time.perf_counter() - start, 3), 'stages': {}}
+    print(f'\n{rows} rows ({distinct} distinct labels) in {root}')
+    print(f'  {"stage":<16} {"wall s":>8} {"peak MB":>8} {"files":>8} {"size MB":>9}')
+    with open(root / 'pipeline.log', 'w', encoding='utf-8') as log:
+        for stage, script, is_batch, measured in STAGES:
+            args = ['--root', str(root)]
+            if is_batch:
+                args += ['--jobs', str(jobs), *batch_args]
+            code, wall, peak = run_stage(script, args, log)
+            files, size = disk_usage(root / measured) if (root / measured).exists() else (0, 0)
+            result['stages'][stage] = {'exit_code': code, 'wall_s': round(wall, 3),
+                                       'peak_rss_mb': peak and round(peak, 1),
+                                       'files': files, 'bytes': size}
+            print(f'  {stage:<16} {wall:8.1f} {peak or 0:8.0f} {files:8d} {size / 1e6:9.1f}'
+                  f'{"" if code == 0 else f"  FAILED ({code}), see pipeline.log"}')
+            if code != 0:
+                break
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    corpus_parser = sub.add_parser('corpus', help='write a synthetic labels CSV')
+    corpus_parser.add_argument('--rows', type=int, required=True)
+    corpus_parser.add_argument('--output', type=Path, required=True)
+    run_parser = sub.add_parser('run', help='run the pipeline on synthetic corpora')
+    run_parser.add_argument('--rows', type=int, nargs='+', required=True,
+                            help='corpus sizes to test')
+    run_parser.add_argument('--jobs', '-j', type=int, default=0,
+                            help='batch worker processes (0 = one per CPU, the default)')
+    run_parser.add_argument('--batch-args', default='',
+                            help='extra batch_generate_svgs.py arguments, e.g. "--layout hash"')
+    run_parser.add_argument('--workdir', type=Path,
+                            help='where to build the corpora (default: a temporary directory, '
+                                 'removed afterwards)')
+    run_parser.add_argument('--output', type=Path, default=RESULTS_PATH,
+                            help='results JSON (default build/scale/results.json)')
+    for sub_parser in (corpus_parser, run_parser):
+        sub_parser.add_argument('--seed', type=int, default=0)
+        sub_parser.add_argument('--words', type=float, default=1.3,
+                                help='mean toki pona words per label (default 1.3)')
+        sub_parser.add_argument('--syllables', type=float, default=3.0,
+                                help='mean syllables per name (default 3)')
+        sub_parser.add_argument('--compound-rate', type=float, default=0.1,
+                                help='share of labels with words that include a compound (default 0.1)')
+        sub_parser.add_argument('--duplicate-rate', type=float, default=0.05,
+                                help='share of rows repeating an earlier label, exactly '
+                                     '(default 0.05)')
+        sub_parser.add_argument('--name-rate', type=float, default=0.7,
+                                help='share of labels with words that also have a name (default 0.7)')
+    args = parser.parse_args()
+    corpus_options = {'seed': args.seed, 'words': args.words, 'syllables': args.syllables,
+                      'compound_rate': args.compound_rate, 'duplicate_rate': args.duplicate_rate,
+                      'name_rate': args.name_rate}
+
+    if args.command == 'corpus':
+        distinct = write_corpus(args.output, args.rows, **corpus_options)
+        print(f'Wrote {args.rows} rows ({distinct} distinct labels) to {args.output}')
+        return
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='skp-scale-'))
+    try:
+        results = [scale_run(rows, workdir, args.jobs, shlex.split(args.batch_args),
+                             corpus_options)
+                   for rows in args.rows]
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'jobs': args.jobs, 'batch_args': args.batch_args, 'corpus': corpus_options,
+                   'runs': results}, f, indent=1)
+    print(f'\nWrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
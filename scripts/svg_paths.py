@@ -0,0 +1,557 @@
+"""
+SVG path parsing, affine transforms and compact path serialization.
+
+Path data is compiled once, in a single tokenizer pass, into a CompiledPath:
+a byte array of absolute segment commands and a float array of their
+coordinates. Bounding boxes, transform baking (--bake in
+generate_sitelen_kalama_pona.py) and serialization all work on that form.
+
+Segments, as yielded by CompiledPath.segments():
+    ('M', x, y)  ('L', x, y)  ('C', x1, y1, x2, y2, x, y)  ('Q', x1, y1, x, y)
+    ('A', rx, ry, rotation, large_arc, sweep, x, y)  ('Z',)
+H/V are turned into L, and S/T into C/Q with their reflected control point.
+"""
+
+import math
+import re
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# Distinct path strings kept compiled; the glyph set has a few thousand
+PATH_CACHE_SIZE = 8192
+
+# One alternation, so each match says whether it is a command or a number
+_TOKEN_RE = re.compile(
+    r'([MmZzLlHhVvCcSsQqTtAa])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+)
+_TRANSFORM_RE = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_ARG_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+M, L, C, Q, A, Z = (ord(c) for c in 'MLCQAZ')
+_STRIDES = {M: 2, L: 2, C: 6, Q: 4, A: 7, Z: 0}
+
+
+class CompiledPath:
+    """Path data parsed into typed arrays of absolute commands and coordinates.
+
+    `commands` holds one byte per segment (M, L, C, Q, A or Z) and `coords`
+    the segment coordinates back to back: 2 for M/L, 6 for C, 4 for Q, 7 for
+    A (rx, ry, rotation, large_arc, sweep, x, y) and none for Z.
+    """
+
+    __slots__ = ('commands', 'coords')
+
+    def __init__(self, commands, coords):
+        self.commands = commands
+        self.coords = coords
+
+    @classmethod
+    def parse(cls, d):
+        """Compile path data in one pass over its tokens."""
+        commands = array('B')
+        coords = array('d')
+        add_command = commands.append
+        add_coords = coords.extend
+
+        cmd = None
+        relative = False
+        n = 0
+        args = []
+        x = y = start_x = start_y = 0.0
+        last_cubic = last_quad = None
+
+        for letter, number in _TOKEN_RE.findall(d or ''):
+            if letter:
+                cmd = letter.upper()
+                relative = letter != cmd
+                n = _ARG_COUNTS[cmd]
+                args = []
+                if cmd == 'Z':
+                    add_command(Z)
+                    x, y = start_x, start_y
+                    last_cubic = last_quad = None
+                continue
+            if cmd is None or cmd == 'Z':
+                continue
+            if cmd == 'A' and 3 <= len(args) <= 4:
+                # Arc flags are a single 0 or 1 and may run into what follows:
+                # 'a1 1 0 011 1' has flags 1 and 1, then x = 1
+                while 3 <= len(args) <= 4 and number:
+                    if number[0] not in '01':
+                        raise ValueError(f'Invalid arc flag in path data: {number!r}')
+                    args.append(float(number[0]))
+                    number = number[1:]
+                if not number:
+                    continue
+            args.append(float(number))
+            if len(args) < n:
+                continue
+
+            a = args
+            args = []
+            ox, oy = (x, y) if relative else (0.0, 0.0)
+            kind = cmd
+            if kind == 'M':
+                x, y = a[0] + ox, a[1] + oy
+                start_x, start_y = x, y
+                add_command(M)
+                add_coords((x, y))
+                # Further coordinate pairs after a moveto are linetos
+                cmd = 'L'
+            elif kind == 'L' or kind == 'H' or kind == 'V':
+                if kind == 'L':
+                    x, y = a[0] + ox, a[1] + oy
+                elif kind == 'H':
+                    x = a[0] + ox
+                else:
+                    y = a[0] + oy
+                add_command(L)
+                add_coords((x, y))
+            elif kind == 'C' or kind == 'S':
+                if kind == 'C':
+                    x1, y1 = a[0] + ox, a[1] + oy
+                    a = a[2:]
+                elif last_cubic:
+                    x1, y1 = 2 * x - last_cubic[0], 2 * y - last_cubic[1]
+                else:
+                    x1, y1 = x, y
+                x2, y2 = a[0] + ox, a[1] + oy
+                x, y = a[2] + ox, a[3] + oy
+                add_command(C)
+                add_coords((x1, y1, x2, y2, x, y))
+                last_cubic = (x2, y2)
+            elif kind == 'Q' or kind == 'T':
+                if kind == 'Q':
+                    x1, y1 = a[0] + ox, a[1] + oy
+                    a = a[2:]
+                elif last_quad:
+                    x1, y1 = 2 * x - last_quad[0], 2 * y - last_quad[1]
+                else:
+                    x1, y1 = x, y
+                x, y = a[0] + ox, a[1] + oy
+                add_command(Q)
+                add_coords((x1, y1, x, y))
+                last_quad = (x1, y1)
+            else:
+                x, y = a[5] + ox, a[6] + oy
+                add_command(A)
+                add_coords((abs(a[0]), abs(a[1]), a[2],
+                            float(a[3] != 0), float(a[4] != 0), x, y))
+
+            if kind != 'C' and kind != 'S':
+                last_cubic = None
+            if kind != 'Q' and kind != 'T':
+                last_quad = None
+
+        return cls(commands, coords)
+
+    def __len__(self):
+        return len(self.commands)
+
+    def segments(self):
+        """Yield the segments as tuples (see the module docstring)."""
+        coords = self.coords
+        i = 0
+        for command in self.commands:
+            stride = _STRIDES[command]
+            seg = (chr(command),) + tuple(coords[i:i + stride])
+            if command == A:
+                seg = seg[:4] + (int(seg[4]), int(seg[5])) + seg[6:]
+            yield seg
+            i += stride
+
+    def points(self):
+        """(xs, ys) of every on-curve and control point; arcs add their endpoint."""
+        coords = self.coords
+        if A not in self.commands:
+            return coords[0::2], coords[1::2]
+        xs = array('d')
+        ys = array('d')
+        i = 0
+        for command in self.commands:
+            stride = _STRIDES[command]
+            if command == A:
+                xs.append(coords[i + 5])
+                ys.append(coords[i + 6])
+            else:
+                xs.extend(coords[i:i + stride:2])
+                ys.extend(coords[i + 1:i + stride:2])
+            i += stride
+        return xs, ys
+
+    def control_bbox(self):
+        """Bbox of points() (min_x, min_y, max_x, max_y), or None if empty.
+
+        Cheap, but loose: curves rarely reach their control points, and arcs
+        can bulge past their endpoints.
+        """
+        xs, ys = self.points()
+        if not xs:
+            return None
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def bbox(self):
+        """Exact bbox (min_x, min_y, max_x, max_y) of the outline, or None if empty.
+
+        Takes curve extrema and arc bounds into account; uses NumPy when it
+        is installed.
+        """
+        if not self.commands:
+            return None
+        if np is not None:
+            return _exact_bbox_numpy(self)
+        return _exact_bbox_python(self)
+
+    def transform(self, m):
+        """A new CompiledPath with the affine m applied to every point."""
+        if m == IDENTITY:
+            return self
+        a, b, c, d, e, f = m
+        coords = self.coords
+        out = array('d')
+        i = 0
+        for command in self.commands:
+            stride = _STRIDES[command]
+            if command == A:
+                rx, ry, rotation, sweep = _transform_arc(
+                    coords[i], coords[i + 1], coords[i + 2], coords[i + 4], m)
+                px, py = coords[i + 5], coords[i + 6]
+                out.extend((rx, ry, rotation, coords[i + 3], sweep,
+                            a * px + c * py + e, b * px + d * py + f))
+            else:
+                for j in range(i, i + stride, 2):
+                    px, py = coords[j], coords[j + 1]
+                    out.append(a * px + c * py + e)
+                    out.append(b * px + d * py + f)
+            i += stride
+        return CompiledPath(self.commands, out)
+
+    def serialize(self, precision=2):
+        """Compact relative path data with coordinates rounded to `precision` decimals.
+
+        Relative offsets are taken between rounded points so rounding errors
+        do not accumulate. Repeated command letters are dropped, as are
+        separators where the next number's sign or decimal point already
+        separates it.
+        """
+        def rnd(v):
+            return round(v, precision)
+
+        parts = []
+        prev_letter = None
+        cx = cy = start_x = start_y = 0.0
+        for seg in self.segments():
+            kind = seg[0]
+            if kind == 'Z':
+                letter, args = 'z', []
+                cx, cy = start_x, start_y
+            elif kind == 'A':
+                px, py = rnd(seg[6]), rnd(seg[7])
+                letter = 'a'
+                args = [rnd(seg[1]), rnd(seg[2]), rnd(seg[3]), seg[4], seg[5],
+                        rnd(px - cx), rnd(py - cy)]
+                cx, cy = px, py
+            else:
+                points = [rnd(v) for v in seg[1:]]
+                args = []
+                for i in range(0, len(points), 2):
+                    args += [rnd(points[i] - cx), rnd(points[i + 1] - cy)]
+                letter = kind.lower()
+                if kind == 'L' and args[1] == 0:
+                    letter, args = 'h', [args[0]]
+                elif kind == 'L' and args[0] == 0:
+                    letter, args = 'v', [args[1]]
+                cx, cy = points[-2], points[-1]
+                if kind == 'M':
+                    start_x, start_y = cx, cy
+
+            # A repeated letter is implicit, and so is 'l' straight after 'm'
+            implicit = letter == prev_letter or (letter == 'l' and prev_letter == 'm')
+            if letter in ('m', 'z') or not implicit:
+                parts.append(letter)
+                prev_number = None
+            else:
+                prev_number = parts[-1] if parts else None
+            prev_letter = 'l' if implicit and letter == 'l' else letter
+
+            for value in args:
+                text = _format_number(value, precision)
+                if prev_number is not None and not (
+                    text.startswith('-') or (text.startswith('.') and '.' in prev_number)
+                ):
+                    parts.append(' ')
+                parts.append(text)
+                prev_number = text
+        return ''.join(parts)
+
+
+def _quadratic_roots(a, b, c):
+    """Roots of a*t^2 + b*t + c strictly inside (0, 1)."""
+    if abs(a) < 1e-12:
+        roots = [-c / b] if abs(b) > 1e-12 else []
+    else:
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return []
+        sq = math.sqrt(disc)
+        roots = [(-b + sq) / (2 * a), (-b - sq) / (2 * a)]
+    return [t for t in roots if 0 < t < 1]
+
+
+def _arc_center(x1, y1, rx, ry, rotation, large_arc, sweep, x2, y2):
+    """Center parametrization of an SVG arc (SVG 1.1 appendix F.6.5).
+
+    Returns (cx, cy, rx, ry, theta1, dtheta) with the radii scaled up if
+    they are too small, or None for an arc that is drawn as a line.
+    """
+    if rx == 0 or ry == 0 or (x1 == x2 and y1 == y2):
+        return None
+    phi = math.radians(rotation)
+    cos_p, sin_p = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p = cos_p * dx + sin_p * dy
+    y1p = -sin_p * dx + cos_p * dy
+    scale = x1p * x1p / (rx * rx) + y1p * y1p / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = math.sqrt(max(num, 0.0) / den)
+    if large_arc == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * y1p / ry, -coef * ry * x1p / rx
+    cx = cos_p * cxp - sin_p * cyp + (x1 + x2) / 2
+    cy = sin_p * cxp + cos_p * cyp + (y1 + y2) / 2
+    theta1 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    theta2 = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx)
+    dtheta = theta2 - theta1
+    if sweep and dtheta < 0:
+        dtheta += 2 * math.pi
+    elif not sweep and dtheta > 0:
+        dtheta -= 2 * math.pi
+    return cx, cy, rx, ry, theta1, dtheta
+
+
+def _exact_bbox_python(path):
+    xs = []
+    ys = []
+    coords = path.coords
+    x = y = start_x = start_y = 0.0
+    i = 0
+    for command in path.commands:
+        stride = _STRIDES[command]
+        seg = coords[i:i + stride]
+        i += stride
+        if command == Z:
+            x, y = start_x, start_y
+            continue
+        if command == C:
+            for axis, values in ((0, xs), (1, ys)):
+                p0, p1, p2, p3 = (x, y)[axis], seg[axis], seg[2 + axis], seg[4 + axis]
+                for t in _quadratic_roots(-p0 + 3 * p1 - 3 * p2 + p3,
+                                          2 * (p0 - 2 * p1 + p2), p1 - p0):
+                    mt = 1 - t
+                    values.append(mt ** 3 * p0 + 3 * mt * mt * t * p1
+                                  + 3 * mt * t * t * p2 + t ** 3 * p3)
+        elif command == Q:
+            for axis, values in ((0, xs), (1, ys)):
+                p0, p1, p2 = (x, y)[axis], seg[axis], seg[2 + axis]
+                for t in _quadratic_roots(0.0, 2 * (p0 - 2 * p1 + p2), 2 * (p1 - p0)):
+                    mt = 1 - t
+                    values.append(mt * mt * p0 + 2 * mt * t * p1 + t * t * p2)
+        elif command == A:
+            arc = _arc_center(x, y, *seg)
+            if arc:
+                cx, cy, rx, ry, theta1, dtheta = arc
+                phi = math.radians(seg[2])
+                cos_p, sin_p = math.cos(phi), math.sin(phi)
+                theta_x = math.atan2(-ry * sin_p, rx * cos_p)
+                theta_y = math.atan2(ry * cos_p, rx * sin_p)
+                direction = 1 if dtheta >= 0 else -1
+                for theta in (theta_x, theta_x + math.pi, theta_y, theta_y + math.pi):
+                    if ((theta - theta1) * direction) % (2 * math.pi) <= abs(dtheta):
+                        cos_t, sin_t = math.cos(theta), math.sin(theta)
+                        xs.append(cx + rx * cos_p * cos_t - ry * sin_p * sin_t)
+                        ys.append(cy + rx * sin_p * cos_t + ry * cos_p * sin_t)
+        x, y = seg[-2], seg[-1]
+        if command == M:
+            start_x, start_y = x, y
+        xs.append(x)
+        ys.append(y)
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _bezier_extrema_numpy(p, a, b, c, degree):
+    """Values of the Bezier control values p at the roots of a*t^2 + b*t + c in (0, 1)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sq = np.sqrt(b * b - 4 * a * c)
+        linear = np.abs(a) < 1e-12
+        t = np.concatenate([
+            np.where(linear, -c / b, (-b + sq) / (2 * a)),
+            np.where(linear, np.nan, (-b - sq) / (2 * a)),
+        ])
+    p = [np.concatenate([v, v]) for v in p]
+    keep = (t > 0) & (t < 1)
+    t = t[keep]
+    p = [v[keep] for v in p]
+    mt = 1 - t
+    if degree == 2:
+        return mt * mt * p[0] + 2 * mt * t * p[1] + t * t * p[2]
+    return mt ** 3 * p[0] + 3 * mt * mt * t * p[1] + 3 * mt * t * t * p[2] + t ** 3 * p[3]
+
+
+def _exact_bbox_numpy(path):
+    commands = np.frombuffer(path.commands, dtype=np.uint8)
+    coords = np.frombuffer(path.coords, dtype=np.float64)
+    strides = np.zeros(256, dtype=np.intp)
+    for command, stride in _STRIDES.items():
+        strides[command] = stride
+    seg_strides = strides[commands]
+    offsets = np.cumsum(seg_strides) - seg_strides
+    index = np.arange(len(commands))
+
+    # Segment end points; Z ends where its subpath's last M started
+    is_z = commands == Z
+    end_at = np.maximum(offsets + seg_strides - 2, 0)
+    end_x = coords[end_at] if len(coords) else np.zeros(len(commands))
+    end_y = coords[end_at + 1] if len(coords) else np.zeros(len(commands))
+    last_m = np.maximum.accumulate(np.where(commands == M, index, 0))
+    end_x = np.where(is_z, end_x[last_m], end_x)
+    end_y = np.where(is_z, end_y[last_m], end_y)
+    start_x = np.concatenate([[0.0], end_x[:-1]])
+    start_y = np.concatenate([[0.0], end_y[:-1]])
+
+    xs = [end_x[~is_z]]
+    ys = [end_y[~is_z]]
+
+    off = offsets[commands == C]
+    if len(off):
+        for axis, values, start in ((0, xs, start_x), (1, ys, start_y)):
+            p0 = start[commands == C]
+            p1, p2, p3 = coords[off + axis], coords[off + 2 + axis], coords[off + 4 + axis]
+            values.append(_bezier_extrema_numpy(
+                (p0, p1, p2, p3), -p0 + 3 * p1 - 3 * p2 + p3,
+                2 * (p0 - 2 * p1 + p2), p1 - p0, 3))
+
+    off = offsets[commands == Q]
+    if len(off):
+        for axis, values, start in ((0, xs, start_x), (1, ys, start_y)):
+            p0 = start[commands == Q]
+            p1, p2 = coords[off + axis], coords[off + 2 + axis]
+            values.append(_bezier_extrema_numpy(
+                (p0, p1, p2), np.zeros_like(p0), 2 * (p0 - 2 * p1 + p2), 2 * (p1 - p0), 2))
+
+    for i in index[commands == A]:
+        o = offsets[i]
+        arc = _arc_center(start_x[i], start_y[i], *path.coords[o:o + 7])
+        if arc:
+            cx, cy, rx, ry, theta1, dtheta = arc
+            phi = math.radians(path.coords[o + 2])
+            cos_p, sin_p = math.cos(phi), math.sin(phi)
+            theta_x = math.atan2(-ry * sin_p, rx * cos_p)
+            theta_y = math.atan2(ry * cos_p, rx * sin_p)
+            theta = np.array([theta_x, theta_x + math.pi, theta_y, theta_y + math.pi])
+            direction = 1 if dtheta >= 0 else -1
+            theta = theta[np.mod((theta - theta1) * direction, 2 * math.pi) <= abs(dtheta)]
+            cos_t, sin_t = np.cos(theta), np.sin(theta)
+            xs.append(cx + rx * cos_p * cos_t - ry * sin_p * sin_t)
+            ys.append(cy + rx * sin_p * cos_t + ry * cos_p * sin_t)
+
+    xs = np.concatenate(xs)
+    ys = np.concatenate(ys)
+    if not len(xs):
+        return None
+    return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_path(d):
+    """CompiledPath for path data, cached by the path string."""
+    return CompiledPath.parse(d)
+
+
+def multiply(m1, m2):
+    """Affine product m1 * m2 (m2 is applied first)."""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (
+        a1 * a2 + c1 * b2,
+        b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2,
+        b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1,
+        b1 * e2 + d1 * f2 + f1,
+    )
+
+
+def parse_transform(transform):
+    """Parse an SVG transform attribute into an affine (a, b, c, d, e, f)."""
+    m = IDENTITY
+    for name, arg_text in _TRANSFORM_RE.findall(transform or ''):
+        args = [float(v) for v in re.split(r'[\s,]+', arg_text.strip()) if v]
+        if name == 'matrix' and len(args) == 6:
+            t = tuple(args)
+        elif name == 'translate' and args:
+            t = (1.0, 0.0, 0.0, 1.0, args[0], args[1] if len(args) > 1 else 0.0)
+        elif name == 'scale' and args:
+            t = (args[0], 0.0, 0.0, args[1] if len(args) > 1 else args[0], 0.0, 0.0)
+        elif name == 'rotate' and args:
+            r = math.radians(args[0])
+            t = (math.cos(r), math.sin(r), -math.sin(r), math.cos(r), 0.0, 0.0)
+            if len(args) == 3:
+                cx, cy = args[1], args[2]
+                t = multiply(multiply((1.0, 0.0, 0.0, 1.0, cx, cy), t),
+                             (1.0, 0.0, 0.0, 1.0, -cx, -cy))
+        elif name == 'skewX' and args:
+            t = (1.0, 0.0, math.tan(math.radians(args[0])), 1.0, 0.0, 0.0)
+        elif name == 'skewY' and args:
+            t = (1.0, math.tan(math.radians(args[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            raise ValueError(f'Unsupported transform: {name}({arg_text})')
+        m = multiply(m, t)
+    return m
+
+
+def _transform_arc(rx, ry, rotation, sweep, m):
+    """Radii, rotation and sweep of an elliptical arc after the affine m."""
+    a, b, c, d = m[:4]
+    if a * d - b * c < 0:
+        sweep = 1.0 - sweep
+    if rx == 0 or ry == 0:
+        return rx, ry, rotation, sweep
+    phi = math.radians(rotation)
+    cos_p, sin_p = math.cos(phi), math.sin(phi)
+    # Columns of M * R(phi) * diag(rx, ry); the new ellipse is T * T^T
+    t11, t21 = (a * cos_p + c * sin_p) * rx, (b * cos_p + d * sin_p) * rx
+    t12, t22 = (c * cos_p - a * sin_p) * ry, (d * cos_p - b * sin_p) * ry
+    p = t11 * t11 + t12 * t12
+    q = t11 * t21 + t12 * t22
+    r = t21 * t21 + t22 * t22
+    mean = (p + r) / 2
+    spread = math.hypot((p - r) / 2, q)
+    new_rx = math.sqrt(mean + spread)
+    new_ry = math.sqrt(max(mean - spread, 0.0))
+    new_rotation = math.degrees(math.atan2(2 * q, p - r) / 2)
+    return new_rx, new_ry, new_rotation, sweep
+
+
+def _format_number(value, precision):
+    text = f'{value:.{precision}f}'
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
@@ -0,0 +1,98 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from batch_generate_svgs import (
+    index_outputs, merge_shards, output_owners, plan_rows, read_manifest, shard_dir, write_shard,
+)
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['qid', 'label', 'tok_title'])
+        writer.writeheader()
+        for qid, label in rows:
+            writer.writerow({'qid': qid, 'label': label, 'tok_title': ''})
+    return path
+
+
+def outputs(csv_file):
+    owners = output_owners(plan_rows(csv_file))
+    index, failed = index_outputs(plan_rows(csv_file), owners, {})
+    return owners, index, failed
+
+
+def test_same_label_shares_one_output(tmp_path):
+    csv_file = write_csv(tmp_path / 'labels.csv', [('Q1', 'ala'), ('Q2', 'jan'), ('Q3', 'ala')])
+    owners, index, failed = outputs(csv_file)
+    assert {name: owner[1]['qid'] for name, owner in owners.items()} == {
+        'sitelen ilo pona - ala.svg': 'Q1', 'sitelen ilo pona - jan.svg': 'Q2'}
+    assert [(name, qid) for _, name, qid, _ in index] == [
+        ('sitelen ilo pona - ala.svg', 'Q1'),
+        ('sitelen ilo pona - jan.svg', 'Q2'),
+        ('sitelen ilo pona - ala.svg', 'Q3'),
+    ]
+    assert failed == []
+
+
+def test_labels_with_the_same_glyphs_keep_their_own_outputs(tmp_path):
+    csv_file = write_csv(tmp_path / 'labels.csv', [('Q1', 'sitelen D'), ('Q2', 'sitelen H')])
+    owners, index, failed = outputs(csv_file)
+    assert sorted(owners) == ['sitelen ilo pona - sitelen, d.svg',
+                              'sitelen ilo pona - sitelen, h.svg']
+    assert len(index) == 2 and failed == []
+
+
+def test_filename_collision_fails_the_later_label(tmp_path):
+    csv_file = write_csv(tmp_path / 'labels.csv', [('Q1', 'jan Osi Lo'), ('Q2', 'jan Osilo')])
+    owners, index, failed = outputs(csv_file)
+    assert [owner[1]['label'] for owner in owners.values()] == ['jan Osi Lo']
+    assert [qid for _, _, qid, _ in index] == ['Q1']
+    assert [(i, label) for i, label, _ in failed] == [(1, 'jan Osilo')]
+    assert 'jan Osi Lo' in failed[0][2]
+
+
+def test_appending_rows_keeps_the_owner(tmp_path):
+    rows = [('Q1', 'jan Osi Lo'), ('Q2', 'ala')]
+    before, _, _ = outputs(write_csv(tmp_path / 'before.csv', rows))
+    after, _, _ = outputs(write_csv(tmp_path / 'after.csv',
+                                    rows + [('Q3', 'jan Osilo'), ('Q4', 'ala')]))
+    assert {name: owner[1] for name, owner in after.items()} == {
+        name: owner[1] for name, owner in before.items()}
+
+
+def test_index_outputs_reports_render_errors(tmp_path):
+    csv_file = write_csv(tmp_path / 'labels.csv', [('Q1', 'ala'), ('Q2', 'ala')])
+    owners = output_owners(plan_rows(csv_file))
+    index, failed = index_outputs(plan_rows(csv_file), owners,
+                                  {'sitelen ilo pona - ala.svg': 'boom'})
+    assert index == [] and failed == [(0, 'ala', 'boom'), (1, 'ala', 'boom')]
+
+
+def write_shards(root, count, failed_in=None):
+    for index in range(1, count + 1):
+        name = f'sitelen ilo pona - {index}.svg'
+        entry = {'label': str(index), 'hash': 'h', 'assets': [], 'path': name}
+        failed = [(index + 100, f'bad {index}', 'boom')] if index == failed_in else []
+        write_shard(shard_dir(index, count, root), (index, count), [(index, name, f'Q{index}', '')],
+                    failed, {name: entry}, {name}, 'flat')
+
+
+def test_merge_keeps_shard_failures(tmp_path):
+    write_shards(tmp_path, 2, failed_in=2)
+    failed = merge_shards(root=tmp_path)
+    assert failed == [(102, 'bad 2', 'boom')]
+    manifest = read_manifest(tmp_path / 'data' / 'output_manifest.json')
+    assert sorted(manifest['outputs']) == ['sitelen ilo pona - 1.svg', 'sitelen ilo pona - 2.svg']
+    assert manifest['failed'] == {'bad 2': 'boom'}
+
+
+def test_merge_refuses_shards_of_another_run(tmp_path):
+    write_shards(tmp_path, 3)
+    for index in (1, 2):
+        os.rename(shard_dir(index, 3, tmp_path), shard_dir(index, 2, tmp_path))
+    shutil.rmtree(shard_dir(3, 3, tmp_path))
+    with pytest.raises(SystemExit):
+        merge_shards(root=tmp_path)
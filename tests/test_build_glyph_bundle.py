@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import build_glyph_bundle
+import generate_sitelen_kalama_pona as gen
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><path d="{d}"/></svg>'
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    words = tmp_path / 'words'
+    syllables = tmp_path / 'syllables'
+    words.mkdir()
+    syllables.mkdir()
+    (words / 'Sitelen seli kiwen - jan.svg').write_text(SVG.format(d='M0 0 L10 10'))
+    (syllables / 'sitelen kalama pona - ka.svg').write_text(SVG.format(d='M0 0 L5 5'))
+    monkeypatch.setattr(gen, 'WORD_SVGS_DIR', words)
+    monkeypatch.setattr(gen, 'SYLLABLES_DIR', syllables)
+    monkeypatch.setattr(gen, 'CARTOUCHE_SVG', tmp_path / 'missing.svg')
+    hashed = []
+    file_sha256 = build_glyph_bundle._file_sha256
+    monkeypatch.setattr(build_glyph_bundle, '_file_sha256',
+                        lambda path: hashed.append(path.name) or file_sha256(path))
+    return words / 'Sitelen seli kiwen - jan.svg', hashed
+
+
+def test_touched_source_is_hashed_once(tmp_path, sources):
+    jan, hashed = sources
+    bundle_path = tmp_path / 'bundle.bin'
+    build_glyph_bundle.build_bundle(bundle_path)
+    st = jan.stat()
+    os.utime(jan, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    hashed.clear()
+
+    build_glyph_bundle.load_bundle(bundle_path)
+    assert hashed == [jan.name]
+    hashed.clear()
+    bundle = build_glyph_bundle.load_bundle(bundle_path)
+    assert hashed == []
+    assert bundle['sources'][gen.source_key(jan)][0] == jan.stat().st_mtime_ns
+
+
+def test_changed_source_rebuilds(tmp_path, sources):
+    jan, _ = sources
+    bundle_path = tmp_path / 'bundle.bin'
+    before = build_glyph_bundle.build_bundle(bundle_path)
+    jan.write_text(SVG.format(d='M0 0 L10 0'))
+    st = jan.stat()
+    os.utime(jan, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    after = build_glyph_bundle.load_bundle(bundle_path)
+    assert after['words']['jan'] != before['words']['jan']
@@ -0,0 +1,40 @@
+import pytest
+
+from generate_sitelen_kalama_pona import CompoundIndex, match_compounds
+
+COMPOUNDS = ['jan-sewi', 'jan-sewi-pona', 'sewi-pona', 'pona-lili', 'tomo-tawa-telo']
+
+
+@pytest.mark.parametrize('tokens, matched', [
+    # The longest compound wins over its own prefix
+    (['jan', 'sewi', 'pona'], ['jan-sewi-pona']),
+    (['jan', 'sewi'], ['jan-sewi']),
+    # A prefix match is kept when the longer compound does not complete
+    (['jan', 'sewi', 'lili'], ['jan-sewi', 'lili']),
+    # Greedy from the left: overlapping compounds are not re-split
+    (['jan', 'sewi', 'pona', 'lili'], ['jan-sewi-pona', 'lili']),
+    (['sewi', 'pona', 'lili'], ['sewi-pona', 'lili']),
+    (['pona', 'lili', 'jan', 'sewi'], ['pona-lili', 'jan-sewi']),
+    # A run that is only the prefix of a compound stays word by word
+    (['tomo', 'tawa'], ['tomo', 'tawa']),
+    (['tomo', 'tawa', 'telo', 'jan'], ['tomo-tawa-telo', 'jan']),
+    ([], []),
+])
+def test_match(tokens, matched):
+    index = CompoundIndex(COMPOUNDS)
+    assert index.match(tokens) == matched
+    assert match_compounds(tokens, COMPOUNDS) == matched
+
+
+def test_size_and_duplicates():
+    index = CompoundIndex(COMPOUNDS + ['jan-sewi'])
+    assert len(index) == len(COMPOUNDS)
+    assert index.longest == 3
+
+
+def test_match_many_returns_independent_lists():
+    index = CompoundIndex(COMPOUNDS)
+    first, second = index.match_many([['jan', 'sewi'], ['jan', 'sewi']])
+    assert first == second == ['jan-sewi']
+    first.append('x')
+    assert second == ['jan-sewi']
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('fontTools')
+
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString  # noqa: E402
+from fontTools.fontBuilder import FontBuilder  # noqa: E402
+from fontTools.pens.ttGlyphPen import TTGlyphPen  # noqa: E402
+
+from extract_sitelen_seli_kiwen import WORDS, ZWJ, find_compounds_via_gsub  # noqa: E402
+
+FEATURES = '''
+lookup two_words {
+    sub jan zwj sewi by jan_sewi;
+    sub tomo zwj tawa by tomo_tawa;
+} two_words;
+lookup three_words {
+    sub jan_sewi zwj pona by jan_sewi_pona;
+    sub tomo_tawa zwj telo by tomo_tawa_telo;
+} three_words;
+lookup alternates {
+    sub jan_sewi by jan_sewi.alt;
+} alternates;
+lookup in_context {
+    sub pona zwj lili by pona_lili;
+} in_context;
+
+feature liga {
+    lookup two_words;
+    lookup three_words;
+} liga;
+feature calt {
+    lookup alternates;
+    sub kala pona' lookup in_context zwj' lili';
+} calt;
+feature ss01 {
+    sub sewi zwj pona by sewi_pona;
+} ss01;
+'''
+
+
+def tiny_font():
+    words = ['jan', 'sewi', 'pona', 'lili', 'tomo', 'tawa', 'telo', 'kala']
+    ligatures = ['jan_sewi', 'jan_sewi.alt', 'jan_sewi_pona', 'tomo_tawa', 'tomo_tawa_telo',
+                 'pona_lili', 'sewi_pona']
+    glyphs = ['.notdef', 'zwj'] + words + ligatures
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(glyphs)
+    builder.setupCharacterMap({**{WORDS[word]: word for word in words}, ZWJ: 'zwj'})
+    builder.setupGlyf({name: TTGlyphPen(None).glyph() for name in glyphs})
+    builder.setupHorizontalMetrics({name: (1000, 0) for name in glyphs})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    addOpenTypeFeaturesFromString(builder.font, FEATURES)
+    return builder.font
+
+
+def test_find_compounds_via_gsub():
+    assert find_compounds_via_gsub(tiny_font()) == {
+        'jan-sewi': 'jan_sewi.alt',
+        'jan-sewi-pona': 'jan_sewi_pona',
+        'tomo-tawa': 'tomo_tawa',
+        'tomo-tawa-telo': 'tomo_tawa_telo',
+        # Lookups applied by contextual rules are followed as if they matched
+        'pona-lili': 'pona_lili',
+    }
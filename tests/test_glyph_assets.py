@@ -0,0 +1,18 @@
+import pytest
+
+from generate_sitelen_kalama_pona import GlyphAssets
+
+
+@pytest.mark.parametrize('bundle', [False, True])
+def test_missing_glyphs_do_not_evict(tmp_path, bundle):
+    assets = GlyphAssets(max_entries=2, bundle_path=tmp_path / 'bundle.bin' if bundle else None)
+    assert assets.word('jan') is not None
+    assert assets.syllable('ka') is not None
+    for junk in ('xyzzy', 'qqq', 'jan-xyzzy'):
+        assert assets.word(junk) is None
+        assert assets.word(junk) is None
+    assets.word('jan')
+    assets.syllable('ka')
+    stats = assets.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 0
+    assert stats['hits'] == 2 and stats['misses'] == 8
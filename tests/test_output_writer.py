@@ -0,0 +1,62 @@
+import os
+import stat
+import time
+
+import pytest
+
+import batch_generate_svgs
+import generate_sitelen_kalama_pona as gen
+from output_writer import FILE_MODE, OutputWriter, atomic_write
+
+
+def _fail(*args):
+    raise OSError(36, 'File name too long')
+
+
+def test_flush_returns_errors_by_key(tmp_path):
+    writer = OutputWriter(2)
+    writer.write(tmp_path / 'a.svg', b'a', key='a.svg')
+    writer.submit(_fail, key='b.svg')
+    errors = writer.flush()
+    assert list(errors) == ['b.svg']
+    assert isinstance(errors['b.svg'], OSError)
+    assert (tmp_path / 'a.svg').read_bytes() == b'a'
+    # Errors are reported once
+    assert writer.close() == {}
+
+
+def test_finish_chunk_fails_only_the_unwritten_output(monkeypatch):
+    monkeypatch.setattr(batch_generate_svgs, 'WRITER', OutputWriter(1))
+    batch_generate_svgs.WRITER.submit(_fail, key='b.svg')
+    results = [('a.svg', None), ('b.svg', None), (None, 'render error')]
+    batch_generate_svgs._finish_chunk(time.perf_counter(), results)
+    assert results[0] == ('a.svg', None)
+    assert results[1][0] is None and 'File name too long' in results[1][1]
+    assert results[2] == (None, 'render error')
+    batch_generate_svgs.WRITER.close()
+
+
+def test_batch_records_failed_write_as_failed_row(tmp_path, monkeypatch, capsys):
+    def failing_write(path, data):
+        if path.name.startswith('sitelen ilo pona - sewi'):
+            _fail()
+        atomic_write(path, data)
+
+    monkeypatch.setattr(gen, 'atomic_write', failing_write)
+    rows = [{'qid': 'Q1', 'label': 'jan', 'tok_title': ''},
+            {'qid': 'Q2', 'label': 'sewi', 'tok_title': ''}]
+    options = {'symbols': False, 'bake': False, 'output_dir': tmp_path}
+    results = list(batch_generate_svgs.iter_results(rows, len(rows), options, jobs=1,
+                                                    writer_threads=2))
+    assert [row['qid'] for row, _, _ in results] == ['Q1', 'Q2']
+    (_, jan_name, jan_error), (_, sewi_name, sewi_error) = results
+    assert jan_error is None and (tmp_path / jan_name).exists()
+    assert sewi_name is None and 'File name too long' in sewi_error
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX file modes')
+def test_atomic_write_uses_the_default_file_mode(tmp_path):
+    atomic_write(tmp_path / 'a.svg', b'a')
+    (tmp_path / 'b.svg').write_bytes(b'b')
+    assert stat.S_IMODE((tmp_path / 'a.svg').stat().st_mode) == FILE_MODE
+    assert stat.S_IMODE((tmp_path / 'b.svg').stat().st_mode) == FILE_MODE
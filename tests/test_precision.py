@@ -0,0 +1,29 @@
+import argparse
+import io
+import json
+
+import pytest
+
+from generate_sitelen_kalama_pona import MAX_PRECISION, parse_precision, render, serve_lines
+
+
+@pytest.mark.parametrize('text', ['-1', str(MAX_PRECISION + 1), '1e3', 'x'])
+def test_parse_precision_rejects(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_precision(text)
+
+
+def test_parse_precision_accepts_the_range():
+    assert [parse_precision(str(n)) for n in range(MAX_PRECISION + 1)] == list(range(MAX_PRECISION + 1))
+
+
+@pytest.mark.parametrize('precision', [-1, MAX_PRECISION + 1])
+def test_render_rejects_precision(precision):
+    with pytest.raises(ValueError, match='precision must be 0 to'):
+        render('jan', bake=True, precision=precision)
+
+
+def test_stdin_request_with_bad_precision_is_an_error_line():
+    out = io.StringIO()
+    serve_lines(['{"text": "jan", "bake": true, "precision": -2}'], out, inline=True)
+    assert 'precision must be 0 to' in json.loads(out.getvalue())['error']
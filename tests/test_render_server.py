@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+import render_server
+
+
+def _render(server, query):
+    return asyncio.run(server.handle_render({k: [v] for k, v in query.items()}, {}))
+
+
+@pytest.mark.parametrize('precision', ['-3', '7', '1e3', 'x'])
+def test_rejects_bad_precision(precision):
+    server = render_server.RenderServer()
+    status, _, body, _ = _render(server, {'text': 'jan', 'bake': '1', 'precision': precision})
+    assert status == 400
+    assert b'precision' in body
+
+
+def test_failed_render_is_not_counted_as_miss(monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError('no glyphs')
+
+    monkeypatch.setattr(render_server, 'render', fail)
+    server = render_server.RenderServer()
+    with pytest.raises(ValueError):
+        _render(server, {'text': 'jan'})
+    assert server.cache.stats()['misses'] == 0
+
+
+def test_miss_then_hit(monkeypatch):
+    calls = []
+
+    def fake_render(text, assets, **options):
+        calls.append(text)
+        return {'svg': b'<svg/>', 'filename': f'{text}.svg'}
+
+    monkeypatch.setattr(render_server, 'render', fake_render)
+    server = render_server.RenderServer()
+    assert _render(server, {'text': 'jan'})[3] == 'miss'
+    assert _render(server, {'text': 'jan'})[3] == 'hit'
+    assert calls == ['jan']
+    stats = server.cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
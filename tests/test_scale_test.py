@@ -0,0 +1,19 @@
+import csv
+
+from generate_sitelen_kalama_pona import FORBIDDEN_SYLLABLES
+from scale_test import inventory, write_corpus
+
+
+def test_duplicate_rate_is_exact(tmp_path):
+    path = tmp_path / 'labels.csv'
+    distinct = write_corpus(path, 2000, duplicate_rate=0.05)
+    with open(path, encoding='utf-8', newline='') as f:
+        labels = [row['label'] for row in csv.DictReader(f)]
+    assert len(labels) == 2000
+    assert distinct == len(set(labels)) == 1900
+
+
+def test_inventory_follows_the_generator_rules():
+    _, _, syllables = inventory()
+    assert 'ka' in syllables and 'kan' in syllables
+    assert not [syllable for syllable in syllables if syllable[:2] in FORBIDDEN_SYLLABLES]
@@ -0,0 +1,70 @@
+import pytest
+
+import svg_paths
+from svg_paths import CompiledPath, compile_path, parse_transform
+
+
+def approx_segments(segments):
+    return [(seg[0], *map(pytest.approx, seg[1:])) for seg in segments]
+
+
+def test_relative_commands():
+    assert list(compile_path('m10 10 l5 0 h5 v5 z').segments()) == [
+        ('M', 10, 10), ('L', 15, 10), ('L', 20, 10), ('L', 20, 15), ('Z',)]
+    assert list(compile_path('M0 0 C0 10 10 10 10 0 S20 -10 20 0').segments())[-1] == (
+        'C', 10, -10, 20, -10, 20, 0)
+    assert list(compile_path('M0 0 Q5 10 10 0 T20 0').segments())[-1] == ('Q', 15, -10, 20, 0)
+
+
+@pytest.mark.parametrize('d, bbox', [
+    ('M0 0 C0 10 10 10 10 0', (0, 0, 10, 7.5)),
+    ('M0 0 Q5 10 10 0', (0, 0, 10, 5)),
+    ('M0 0 A10 10 0 0 1 20 0', (0, -10, 20, 0)),
+    ('M0 0 A10 10 0 0 0 20 0', (0, 0, 20, 10)),
+    ('M-10 0 A10 5 0 1 0 10 0 A10 5 0 1 0 -10 0', (-10, -5, 10, 5)),
+])
+def test_bbox(d, bbox):
+    assert compile_path(d).bbox() == pytest.approx(bbox, abs=1e-9)
+
+
+def test_transformed_bbox():
+    square = compile_path('M0 0 L10 0 L10 10 Z')
+    assert square.transform(parse_transform('translate(5,5) scale(2)')).bbox() == (5, 5, 25, 25)
+    ellipse = compile_path('M-10 0 A10 5 0 1 0 10 0 A10 5 0 1 0 -10 0')
+    assert ellipse.transform(parse_transform('rotate(90)')).bbox() == pytest.approx((-5, -10, 5, 10))
+    assert ellipse.transform(parse_transform('translate(5,5) scale(2)')).bbox() == pytest.approx(
+        (-15, -5, 25, 15))
+
+
+@pytest.mark.skipif(svg_paths.np is None, reason='numpy not installed')
+def test_bbox_python_matches_numpy():
+    path = compile_path('M-10 0 A10 5 0 1 0 10 0 A10 5 0 1 0 -10 0 M0 0 C0 10 10 10 10 0')
+    path = path.transform(parse_transform('rotate(30)'))
+    assert svg_paths._exact_bbox_python(path) == pytest.approx(svg_paths._exact_bbox_numpy(path))
+
+
+@pytest.mark.parametrize('d', [
+    'M10 10 L15 10 L15 20 Z',
+    'M0 0 C0 10 10 10 10 0 S20 -10 20 0',
+    'M0 0 Q5 10 10 0 T20 0',
+    'M0 0 A10 10 0 0 1 20 0 L-1.5 -.5',
+    'M1.25 2.5 h3.125 v-1e-3 m4 4 l1 1 z',
+])
+def test_serialize_round_trip(d):
+    path = compile_path(d)
+    again = CompiledPath.parse(path.serialize(precision=6))
+    assert approx_segments(again.segments()) == list(path.segments())
+
+
+def test_serialize():
+    assert compile_path('M10 10 L15 10 L15 20 Z').serialize() == 'm10 10h5v10z'
+    assert compile_path('M0 0 L-1.5 -.5').serialize() == 'm0 0-1.5-.5'
+
+
+def test_packed_arc_flags():
+    assert list(compile_path('M0 0 a1 1 0 011 1').segments()) == list(
+        compile_path('M0 0 a1 1 0 0 1 1 1').segments())
+    assert list(compile_path('M0 0 a10 10 0 1020 0').segments()) == list(
+        compile_path('M0 0 a10 10 0 1 0 20 0').segments())
+    with pytest.raises(ValueError, match='arc flag'):
+        compile_path('M0 0 a1 1 0 2 1 1 1')
@@ -0,0 +1,45 @@
+import pytest
+
+from generate_sitelen_kalama_pona import parse_many, parse_syllables, syllabify
+
+
+@pytest.mark.parametrize('name, syllables', [
+    ('Amatelasu', ['a', 'ma', 'te', 'la', 'su']),
+    ('Kanata', ['ka', 'na', 'ta']),
+    ('Anna', ['an', 'na']),
+    ('Kristo', ['k', 'i', 's', 'to']),
+    ('Seki-Lowenki', ['se', 'ki', 'lo', 'wen', 'ki']),
+])
+def test_parse_syllables(name, syllables):
+    assert parse_syllables(name) == syllables
+    assert syllabify(name)[0] == syllables
+
+
+def test_problems():
+    _, problems = syllabify('Kristo Tiwo')
+    assert [(p['start'], p['end'], p['text'], p['reason']) for p in problems] == [
+        (0, 1, 'K', 'no vowel'),
+        (1, 2, 'r', 'skipped'),
+        (3, 4, 's', 'no vowel'),
+        (6, 7, ' ', 'skipped'),
+        (7, 9, 'Ti', 'forbidden'),
+        (9, 11, 'wo', 'forbidden'),
+    ]
+    assert [p['reason'] for p in syllabify('Anma')[1]] == ['nasal']
+    assert syllabify('Amatelasu')[1] == []
+
+
+def test_spans_follow_name_when_lowercasing_changes_length():
+    # 'İ'.lower() is two code points
+    name = 'Aİsta'
+    _, problems = syllabify(name)
+    for problem in problems:
+        assert name[problem['start']:problem['end']] == problem['text']
+    assert [(p['text'], p['reason']) for p in problems] == [('İ', 'skipped'), ('s', 'no vowel')]
+
+
+def test_parse_many_memoizes_without_sharing_results():
+    first, second = parse_many(['Kanata', 'Kanata'])
+    assert first == second == (['ka', 'na', 'ta'], [])
+    first[0].append('x')
+    assert second[0] == ['ka', 'na', 'ta']